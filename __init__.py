@@ -7,6 +7,8 @@ from rb_status_plugin.core.views import (
     EditReportFormView,
 )
 from rb_status_plugin.sensors.status_sensor import StatusSensor
+from rb_status_plugin.sensors.status_batch_sensor import StatusBatchSensor
+from rb_status_plugin.sensors.probe_result_sensor import ProbeResultSensor
 from rb_status_plugin.core.flask_admin_packages import (
     v_admin_status_package,
     v_admin_reports_package,
@@ -55,7 +57,7 @@ bp = Blueprint(
 class RbStatusPlugin(AirflowPlugin):
     name = "rb_status_plugin"
     operators = []
-    sensors = [StatusSensor]
+    sensors = [StatusSensor, StatusBatchSensor, ProbeResultSensor]
     flask_blueprints = [bp]
     hooks = []
     executors = []
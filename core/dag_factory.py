@@ -0,0 +1,319 @@
+from datetime import timedelta
+from airflow import DAG, configuration
+from airflow.operators.python_operator import PythonOperator
+from airflow.operators.latest_only_operator import LatestOnlyOperator
+from airflow.sensors.base_sensor_operator import BaseSensorOperator
+from airflow.utils import timezone
+
+from rb_status_plugin.sensors.status_sensor import StatusSensor
+from rb_status_plugin.sensors.status_batch_sensor import StatusBatchSensor
+from rb_status_plugin.sensors.probe_result_sensor import ProbeResultSensor
+from rb_status_plugin.core.helpers.email_helpers import report_notify_email
+from rb_status_plugin.core.models import ResultRecord
+from rb_status_plugin.core.report_repo import get_report_repo
+
+import hashlib
+import json
+import logging
+import threading
+import time
+import zlib
+
+plugin_path = configuration.get("core", "plugins_folder")
+# Consider moving these constants to an Airflow variable...
+EMAIL_TEMPLATE_LOCATION = f"{plugin_path}/rb_status_plugin/templates/emails"
+SINGLE_EMAIL_TEMPLATE = f"{EMAIL_TEMPLATE_LOCATION}/single_report.html"
+
+# Report DAG ids never contain "__", so the probe DAG cannot clash with one
+PROBE_DAG_ID = "rb_status__probe"
+
+
+def probe_settings():
+    """
+    The probe options of [rb_status_plugin]: whether tests are checked by
+    the shared probe DAG, its schedule, its sensors' timeout in seconds,
+    and for how many days its results are kept
+    """
+    return {
+        "enabled": configuration.getboolean(
+            "rb_status_plugin", "probe_tests", fallback=False
+        ),
+        "schedule": configuration.get(
+            "rb_status_plugin", "probe_schedule", fallback="*/15 * * * *"
+        ),
+        "timeout": configuration.getint(
+            "rb_status_plugin", "probe_timeout", fallback=3600
+        ),
+        "retention_days": configuration.getint(
+            "rb_status_plugin", "probe_retention_days", fallback=7
+        ),
+    }
+
+
+def sensor_args(report=None):
+    """
+    Poke settings shared by the sensors of a report, or of the probe.  The
+    report's own poke_interval, timeout and sensor_mode take precedence, and
+    invalid ones, which report files may hold, raise a ValueError.
+    """
+    args = {
+        "mode": (report and report.sensor_mode)
+        or configuration.get("rb_status_plugin", "sensor_mode", fallback="reschedule"),
+        "max_poke_interval": (report and report.max_poke_interval)
+        or configuration.getint("rb_status_plugin", "max_poke_interval", fallback=600),
+        "lookback": timedelta(
+            hours=configuration.getint(
+                "rb_status_plugin", "test_lookback_hours", fallback=0
+            )
+        )
+        or None,
+    }
+    if report is not None:
+        args.update(
+            {
+                key: getattr(report, key)
+                for key in ("poke_interval", "timeout")
+                if getattr(report, key) is not None
+            }
+        )
+    if args["mode"] not in BaseSensorOperator.valid_modes:
+        raise ValueError(f"Unknown sensor_mode {args['mode']}")
+    for key in ("poke_interval", "timeout"):
+        if args.get(key, 1) < 1:
+            raise ValueError(f"{key} must be at least 1 second, not {args[key]}")
+    return args
+
+
+def task_args(report):
+    """ The report's pool and priority_weight, applied to all of its tasks """
+    return {
+        key: getattr(report, key)
+        for key in ("pool", "priority_weight")
+        if getattr(report, key) is not None
+    }
+
+
+def create_dag(report, default_args):
+    dag = DAG(
+        report.dag_id,
+        schedule_interval=report.schedule,
+        default_args={**default_args, **task_args(report)},
+    )
+
+    with dag:
+        test_prefix = "test_"
+        poke_args = sensor_args(report)
+
+        start = LatestOnlyOperator(task_id="start_dag")
+        send_email = PythonOperator(
+            task_id="call_email_function",
+            python_callable=report_notify_email,
+            trigger_rule="all_done",
+            op_kwargs={
+                "report": report,
+                "email_template_location": SINGLE_EMAIL_TEMPLATE,
+            },
+            provide_context=True,
+        )
+        probe = probe_settings()
+        if probe["enabled"]:
+            t1 = ProbeResultSensor(
+                task_id="collect_results",
+                tests=report.tests,
+                probe_dag_id=PROBE_DAG_ID,
+                probe_schedule=probe["schedule"],
+                probe_timeout=probe["timeout"],
+                **{k: v for (k, v) in poke_args.items() if k != "lookback"},
+            )
+            start >> t1 >> send_email
+        elif report.batch_tests:
+            t1 = StatusBatchSensor(
+                task_id=test_prefix + "all", tests=report.tests, **poke_args
+            )
+            start >> t1 >> send_email
+        else:
+            for test in report.tests:
+                t1 = StatusSensor(
+                    task_id=test_prefix + test,
+                    test_dag_id=test.split(".")[0],
+                    test_task_id=test.split(".")[1],
+                    **poke_args,
+                )
+                start >> t1 >> send_email
+
+    return dag
+
+
+def prune_probe_results(retention_days):
+    """ Deletes the results of the probe runs older than retention_days """
+    before = timezone.utcnow() - timedelta(days=retention_days)
+    deleted = ResultRecord.delete_before(PROBE_DAG_ID, before)
+    logging.info(f"Deleted {deleted} probe results from before {before}")
+
+
+def create_probe_dag(tests, default_args):
+    """
+    Builds the DAG checking each distinct test of all reports once per
+    schedule tick.  Its sensors record the tests' results, which the
+    report DAGs then collect, and old results are pruned.
+    """
+    settings = probe_settings()
+    dag = DAG(
+        PROBE_DAG_ID,
+        schedule_interval=settings["schedule"],
+        default_args=default_args,
+        catchup=False,
+        max_active_runs=1,
+    )
+
+    with dag:
+        poke_args = sensor_args()
+
+        start = LatestOnlyOperator(task_id="start_dag")
+        prune = PythonOperator(
+            task_id="prune_results",
+            python_callable=prune_probe_results,
+            op_kwargs={"retention_days": settings["retention_days"]},
+        )
+        start >> prune
+        for test in tests:
+            # A test that does not finish in time is probed again next tick
+            t1 = StatusSensor(
+                task_id="test_" + test,
+                test_dag_id=test.split(".")[0],
+                test_task_id=test.split(".")[1],
+                timeout=settings["timeout"],
+                soft_fail=True,
+                **poke_args,
+            )
+            start >> t1
+
+    return dag
+
+
+class DagCache:
+    """
+    Per-process cache of report DAGs, keyed by report name.  A DAG is
+    reused for as long as the content hash of its report's definition,
+    default_args and sensor settings is unchanged, so parsing the report
+    DAG file again only builds the DAGs of reports that changed.
+
+    The module is imported once per process, unlike the DAG file that
+    Airflow executes again on every parse, so the cache outlives a parse.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dags = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def content_hash(data):
+        payload = json.dumps(data, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get(self, report, default_args):
+        """
+        Returns the DAG of report, building it with create_dag if the
+        report changed since it was last built
+        """
+        key = self.content_hash(
+            {
+                "dag_id": report.dag_id,
+                "definition": report.definition,
+                "default_args": default_args,
+                "sensor_args": sensor_args(report),
+                "probe": probe_settings()["enabled"],
+            }
+        )
+        return self._get(report.name, key, lambda: create_dag(report, default_args))
+
+    def get_probe(self, tests, default_args):
+        """
+        Returns the probe DAG of tests, building it with create_probe_dag
+        if the tests or settings changed since it was last built
+        """
+        key = self.content_hash(
+            {
+                "tests": tests,
+                "default_args": default_args,
+                "sensor_args": sensor_args(),
+                "probe": probe_settings(),
+            }
+        )
+        return self._get(
+            PROBE_DAG_ID, key, lambda: create_probe_dag(tests, default_args)
+        )
+
+    def _get(self, name, key, build):
+        with self._lock:
+            cached = self._dags.get(name)
+            if cached is not None and cached[0] == key:
+                self.hits += 1
+                return cached[1]
+        dag = build()
+        with self._lock:
+            self._dags[name] = (key, dag)
+            self.misses += 1
+        return dag
+
+    def prune(self, names, shard=0, shards=1):
+        """ Forgets the DAGs of the reports of shard that are not in names """
+        names = set(names)
+        with self._lock:
+            for name in list(self._dags):
+                if name not in names and report_shard(name, shards) == shard:
+                    del self._dags[name]
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._dags = {}
+            self.hits = 0
+            self.misses = 0
+
+
+dag_cache = DagCache()
+
+
+def report_shard(name, shards):
+    """ Shard of a report, the same in every process and Python run """
+    return zlib.crc32(name.encode("utf-8")) % shards
+
+
+def load_dags(default_args, shard=0, shards=1):
+    """
+    Returns the DAGs of the reports whose name falls into shard, by report
+    name, and logs how long they took to load.  Reports whose DAG cannot be
+    built are logged and skipped.  With probe_tests on, the shard
+    PROBE_DAG_ID falls into also holds the probe DAG.
+    """
+    started = time.monotonic()
+    hits = dag_cache.hits
+    dags = {}
+    tests = set()
+    for report in get_report_repo().list():
+        tests.update(test for test in report.tests or [] if "." in test)
+        if report_shard(report.name, shards) == shard:
+            # A broken report only loses its own DAG, not its whole shard
+            try:
+                dags[report.name] = dag_cache.get(report, default_args)
+            except Exception:
+                logging.exception(f"Could not build the DAG of report {report.name}")
+    if probe_settings()["enabled"] and report_shard(PROBE_DAG_ID, shards) == shard:
+        try:
+            dags[PROBE_DAG_ID] = dag_cache.get_probe(sorted(tests), default_args)
+        except Exception:
+            logging.exception("Could not build the probe DAG")
+    dag_cache.prune(dags, shard, shards)
+
+    logging.info(
+        f"Parsed {len(dags)} report DAGs of shard {shard + 1}/{shards} "
+        f"in {time.monotonic() - started:.2f}s, {dag_cache.hits - hits} reused "
+        f"from cache (hit rate {dag_cache.hit_rate():.0%} since process start)"
+    )
+    return dags
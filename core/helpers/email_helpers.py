@@ -5,6 +5,8 @@ import logging
 import pendulum
 
 from rb_status_plugin.core.report_instance import ReportInstance
+from rb_status_plugin.core.models import ResultRecord, StatusSnapshot
+from rb_status_plugin.core.helpers.task_state_helper import TaskState
 from rb_status_plugin.core.views import StatusView
 from rb_status_plugin.core.flask_admin_packages import v_admin_status_package
 
@@ -31,10 +33,32 @@ def get_status(passed):
     return "Success" if passed else "Failed"
 
 
+def record_missing_results(report, context):
+    """
+    Stores an unknown result for each test of the report without a result
+    in this run, linking to the logs of the test's sensor
+    """
+    dag_run = context["dag_run"]
+    dag = context["dag"]
+    missing = set(report.tests) - ResultRecord.tests_of(dag_run.id)
+    results = {}
+    for test in missing:
+        # The test's own sensor, else the task checking all of the tests
+        sensor_id = next(
+            task_id
+            for task_id in ("test_" + test, "test_all", "collect_results")
+            if dag.has_task(task_id)
+        )
+        sensor = TaskState(dag_run.dag_id, sensor_id, dag_run.execution_date, None)
+        results[test] = (None, sensor.log_url)
+    if results:
+        ResultRecord.save_many(dag_run.id, results)
+
+
 def report_notify_email(report, email_template_location, **context):
     """
-    For the given report, sends a notification email in the format given
-    in the email_template
+    For the given report, stores a status snapshot of the run and sends
+    a notification email in the format given in the email_template
 
     :param report: report being notified on
     :type report: Report
@@ -45,8 +69,13 @@ def report_notify_email(report, email_template_location, **context):
     :param test_prefix: the prefix that precedes all test tasks
     :type test_prefix: str
     """
+    # Tests whose sensor never ran (e.g. when the run was skipped) are unknown
+    record_missing_results(report, context)
     ri = ReportInstance(context["dag_run"])
 
+    # Record the run's status for the status page before notifying
+    StatusSnapshot.save(ri)
+
     updated_time = ri.updated
     timezone = pendulum.timezone(conf.get("core", "default_timezone"))
     updated_time.replace(tzinfo=timezone)
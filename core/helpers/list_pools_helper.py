@@ -0,0 +1,9 @@
+from airflow.models import Pool
+from airflow.utils.db import provide_session
+
+
+@provide_session
+def get_pool_choices(session=None):
+    """ Choices of the report form's pool field, the default pool first """
+    pools = session.query(Pool.pool).order_by(Pool.pool).all()
+    return [("", "Default pool")] + [(pool, pool) for (pool,) in pools]
@@ -0,0 +1,359 @@
+from airflow.configuration import conf
+from airflow.models import DagRun
+from airflow.models.taskinstance import TaskInstance
+from airflow.utils import timezone
+from airflow.utils.db import create_session, provide_session
+from airflow.utils.state import State
+from sqlalchemy import and_, func, or_
+from urllib.parse import quote
+
+from rb_status_plugin.core.models import TaskStateRecord, TestStateRecord
+
+import collections
+import datetime
+import logging
+import threading
+
+TERMINAL_FAILURE_STATES = [
+    State.FAILED,
+    State.UPSTREAM_FAILED,
+    State.SHUTDOWN,
+    State.REMOVED,
+]
+TERMINAL_SUCCESS_STATES = [State.SUCCESS, State.SKIPPED]
+
+
+class TaskState(
+    collections.namedtuple(
+        "TaskState", ["dag_id", "task_id", "execution_date", "state"]
+    )
+):
+    """
+    The columns of a test's task instance that the status sensors read,
+    loaded without the rest of the TaskInstance row
+    """
+
+    __slots__ = ()
+
+    @property
+    def log_url(self):
+        """ Same as TaskInstance.log_url """
+        iso = quote(self.execution_date.isoformat())
+        base_url = conf.get("webserver", "BASE_URL")
+        return base_url + (
+            f"/log?execution_date={iso}&task_id={self.task_id}&dag_id={self.dag_id}"
+        )
+
+
+def tests_criteria(model, tests):
+    """ Filters rows of a model with dag_id and task_id columns to tests """
+    task_ids = collections.defaultdict(list)
+    for test in tests:
+        (dag_id, task_id) = test.split(".", 1)
+        task_ids[dag_id].append(task_id)
+    return or_(
+        *[
+            and_(model.dag_id == dag_id, model.task_id.in_(tasks))
+            for (dag_id, tasks) in task_ids.items()
+        ]
+    )
+
+
+def task_state_columns():
+    TI = TaskInstance
+    return (TI.dag_id, TI.task_id, TI.execution_date, TI.state)
+
+
+@provide_session
+def latest_task_state(dag_id, task_id, since=None, session=None):
+    """
+    Returns the TaskState of the latest task instance of a test.  Only the
+    needed columns are selected, and with since the search is bounded to
+    task instances executed from then on, so the lookup stays a short range
+    scan of the (task_id, dag_id, execution_date) primary key.
+
+    :param since: earliest execution_date to consider
+    :type since: datetime.datetime
+
+    :return: the TaskState, or None when there is no task instance
+    """
+    row = latest_task_state_query(dag_id, task_id, since, session).first()
+    return TaskState(*row) if row else None
+
+
+def latest_task_state_query(dag_id, task_id, since, session):
+    TI = TaskInstance
+    query = session.query(*task_state_columns()).filter(
+        TI.task_id == task_id, TI.dag_id == dag_id
+    )
+    if since is not None:
+        query = query.filter(TI.execution_date >= since)
+    return query.order_by(TI.execution_date.desc()).limit(1)
+
+
+@provide_session
+def latest_task_states(tests, since=None, session=None):
+    """
+    Returns a dict of test ("dag_id.task_id") to the TaskState of its latest
+    task instance, for many tests with a single query.  since bounds the
+    search as in latest_task_state.
+    """
+    if not tests:
+        return {}
+
+    TI = TaskInstance
+    latest = session.query(
+        TI.dag_id, TI.task_id, func.max(TI.execution_date).label("execution_date")
+    ).filter(tests_criteria(TI, tests))
+    if since is not None:
+        latest = latest.filter(TI.execution_date >= since)
+    latest = latest.group_by(TI.dag_id, TI.task_id).subquery()
+
+    rows = (
+        session.query(*task_state_columns())
+        .join(
+            latest,
+            and_(
+                TI.dag_id == latest.c.dag_id,
+                TI.task_id == latest.c.task_id,
+                TI.execution_date == latest.c.execution_date,
+            ),
+        )
+        .all()
+    )
+    return {f"{row[0]}.{row[1]}": TaskState(*row) for row in rows}
+
+
+class TaskStateCache:
+    """
+    A short-lived cache of the latest TaskState of tests, shared by the
+    sensors poking in a process, so reports monitoring the same task do
+    not each query task_instance.  Entries live for test_state_cache_ttl
+    seconds (0 turns the cache off).  With test_state_cache_backend set to
+    database they are also kept in the rb_status_task_state table and
+    shared between worker processes.  That table is read and written in
+    sessions of its own, on a best-effort basis: failures are logged and
+    never fail a sensor's poke.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # test -> (since, TaskState or None, checked_at)
+        self._entries = {}
+
+    @staticmethod
+    def ttl():
+        return conf.getint("rb_status_plugin", "test_state_cache_ttl", fallback=30)
+
+    @staticmethod
+    def backend():
+        return conf.get(
+            "rb_status_plugin", "test_state_cache_backend", fallback="memory"
+        )
+
+    @staticmethod
+    def lookup(entry, since, fresh_after):
+        """
+        Answers a lookup bounded by since from an entry.  An entry read with
+        an earlier (or no) bound still holds the latest state from since on.
+
+        :return: whether the entry answers the lookup, and the TaskState
+        """
+        if entry is None:
+            return False, None
+        (entry_since, state, checked_at) = entry
+        if checked_at < fresh_after:
+            return False, None
+        if entry_since is not None and (since is None or since < entry_since):
+            return False, None
+        if state is not None and since is not None and state.execution_date < since:
+            return True, None
+        return True, state
+
+    @provide_session
+    def get_many(self, tests, since=None, session=None):
+        """
+        Returns a dict of test to the TaskState of its latest task instance,
+        like latest_task_states, reading task_instance only for the tests
+        that are not cached
+        """
+        ttl = self.ttl()
+        if ttl <= 0:
+            return latest_task_states(tests, since=since, session=session)
+
+        now = timezone.utcnow()
+        fresh_after = now - datetime.timedelta(seconds=ttl)
+        states = {}
+        missing = []
+        with self._lock:
+            entries = {test: self._entries.get(test) for test in tests}
+        if self.backend() == "database":
+            stale = [
+                test
+                for test in tests
+                if not self.lookup(entries[test], since, fresh_after)[0]
+            ]
+            entries.update(self.load_records(stale, fresh_after))
+
+        for test in tests:
+            (hit, state) = self.lookup(entries[test], since, fresh_after)
+            if hit:
+                if state is not None:
+                    states[test] = state
+            else:
+                missing.append(test)
+        if not missing:
+            return states
+
+        if len(missing) == 1:
+            (dag_id, task_id) = missing[0].split(".", 1)
+            state = latest_task_state(dag_id, task_id, since=since, session=session)
+            loaded = {missing[0]: state} if state else {}
+        else:
+            loaded = latest_task_states(missing, since=since, session=session)
+        states.update(loaded)
+
+        fetched = {test: (since, loaded.get(test), now) for test in missing}
+        with self._lock:
+            self._entries.update(fetched)
+        if self.backend() == "database":
+            self.save_records(fetched)
+        return states
+
+    @staticmethod
+    def load_records(tests, fresh_after):
+        """ Returns the fresh cached entries of tests, none if the read fails """
+        if not tests:
+            return {}
+        try:
+            with create_session() as session:
+                records = (
+                    session.query(TaskStateRecord)
+                    .filter(
+                        tests_criteria(TaskStateRecord, tests),
+                        TaskStateRecord.checked_at >= fresh_after,
+                    )
+                    .all()
+                )
+        except Exception:
+            logging.warning("Could not read cached task states", exc_info=True)
+            return {}
+
+        entries = {}
+        for record in records:
+            state = None
+            if record.execution_date is not None:
+                state = TaskState(
+                    record.dag_id, record.task_id, record.execution_date, record.state
+                )
+            entries[f"{record.dag_id}.{record.task_id}"] = (
+                record.since,
+                state,
+                record.checked_at,
+            )
+        return entries
+
+    @staticmethod
+    def save_records(entries):
+        """
+        Stores cached entries.  Sensors sharing a test may insert the same
+        record at once, the losing write is only logged.
+        """
+        try:
+            with create_session() as session:
+                for (test, (since, state, checked_at)) in entries.items():
+                    (dag_id, task_id) = test.split(".", 1)
+                    session.merge(
+                        TaskStateRecord(
+                            dag_id=dag_id,
+                            task_id=task_id,
+                            since=since,
+                            execution_date=state.execution_date if state else None,
+                            state=state.state if state else None,
+                            checked_at=checked_at,
+                        )
+                    )
+        except Exception:
+            logging.warning("Could not cache task states", exc_info=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+
+
+task_state_cache = TaskStateCache()
+
+
+def record_test_state(context):
+    """
+    Task callback recording the state of a test in the plugin's
+    rb_status_test_state table, from which sensors resolve it without
+    polling task_instance.  Attach it to the monitored tasks (e.g. through
+    default_args) as on_success_callback and on_failure_callback, and as
+    on_execute_callback and on_retry_callback so that a new run is not
+    mistaken for the last finished one.
+    """
+    TestStateRecord.record(context["ti"])
+
+
+@provide_session
+def recorded_task_states(tests, since=None, session=None):
+    """
+    Returns a dict of test to the TaskState recorded by its callbacks, for
+    the tests whose recorded run finished (from since on, when given)
+    """
+    if not tests:
+        return {}
+    query = session.query(
+        TestStateRecord.dag_id,
+        TestStateRecord.task_id,
+        TestStateRecord.execution_date,
+        TestStateRecord.state,
+    ).filter(
+        tests_criteria(TestStateRecord, tests),
+        TestStateRecord.state.in_(TERMINAL_SUCCESS_STATES + TERMINAL_FAILURE_STATES),
+    )
+    if since is not None:
+        query = query.filter(TestStateRecord.execution_date >= since)
+    return {f"{row[0]}.{row[1]}": TaskState(*row) for row in query}
+
+
+def latest_run_dates(dag_ids, since, session):
+    """
+    Returns a dict of dag_id to the execution_date of its latest DagRun
+    (from since on, when given), read from the small dag_run table
+    """
+    if not dag_ids:
+        return {}
+    query = session.query(DagRun.dag_id, func.max(DagRun.execution_date)).filter(
+        DagRun.dag_id.in_(dag_ids)
+    )
+    if since is not None:
+        query = query.filter(DagRun.execution_date >= since)
+    return dict(query.group_by(DagRun.dag_id).all())
+
+
+@provide_session
+def current_task_states(tests, since=None, session=None):
+    """
+    Returns a dict of test to the TaskState of its latest task instance.
+    Tests with a finished run recorded by their callbacks are resolved from
+    it, the others are read through the task state cache.  A record is only
+    trusted when its DAG has no later run: runs that are only queued, or
+    whose tasks the scheduler skipped or marked upstream_failed, fire no
+    callback and leave the previous run's record in place.
+    """
+    recorded = recorded_task_states(tests, since=since, session=session)
+    latest = latest_run_dates(
+        {state.dag_id for state in recorded.values()}, since, session
+    )
+    states = {
+        test: state
+        for (test, state) in recorded.items()
+        if latest.get(state.dag_id) is None
+        or state.execution_date >= latest[state.dag_id]
+    }
+    polled = [test for test in tests if test not in states]
+    if polled:
+        states.update(task_state_cache.get_many(polled, since=since, session=session))
+    return states
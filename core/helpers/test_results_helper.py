@@ -0,0 +1,115 @@
+from airflow.utils.db import provide_session
+from airflow.models import DagRun, TaskInstance, XCom
+from airflow.utils.state import State
+from sqlalchemy import and_, or_
+
+from rb_status_plugin.core.models import ResultRecord
+
+# XCom keys of the sensors before the rb_status_result table
+TEST_STATUS_KEY = "rb_status_test_task_status"
+LOG_URL_KEY = "rb_status_task_log_url"
+TEST_OPERATORS = ["StatusSensor"]
+
+
+@provide_session
+def get_test_results(dag_runs, session=None):
+    """
+    Loads the test results of a set of report DagRuns from the
+    rb_status_result table with one indexed query.  Runs from before the
+    table, which have no rows there, are read from their sensors' XComs.
+
+    :param dag_runs: report DagRuns to load test results for
+    :type dag_runs: list
+
+    :return: a dict of DagRun id to a list of test result dicts with
+        [id, name, log_url, test_status]
+    :rtype: dict
+    """
+    dag_run_ids = [dag_run.id for dag_run in dag_runs]
+    if not dag_run_ids:
+        return {}
+
+    records = session.query(ResultRecord).filter(
+        ResultRecord.dag_run_id.in_(dag_run_ids)
+    )
+    results = {dag_run_id: [] for dag_run_id in dag_run_ids}
+    for record in records:
+        results[record.dag_run_id].append(
+            {
+                "id": record.id,
+                "name": record.test,
+                "log_url": record.log_url,
+                "test_status": record.status,
+            }
+        )
+
+    legacy_runs = [dag_run for dag_run in dag_runs if not results[dag_run.id]]
+    if legacy_runs:
+        results.update(get_xcom_test_results(legacy_runs, session=session))
+    return results
+
+
+@provide_session
+def get_xcom_test_results(dag_runs, session=None):
+    """
+    Loads the StatusSensor task instances and their status XComs for a
+    set of report DagRuns with two set-based queries.
+
+    :param dag_runs: report DagRuns to load test results for
+    :type dag_runs: list
+
+    :return: a dict of DagRun id to a list of test result dicts with
+        [id, name, log_url, test_status]
+    :rtype: dict
+    """
+    dag_run_ids = [dag_run.id for dag_run in dag_runs]
+    if not dag_run_ids:
+        return {}
+
+    TI = TaskInstance
+    DR = DagRun
+    tis = (
+        session.query(TI, DR.id)
+        .join(DR, and_(TI.dag_id == DR.dag_id, TI.execution_date == DR.execution_date))
+        .filter(
+            DR.id.in_(dag_run_ids),
+            TI.operator.in_(TEST_OPERATORS),
+            # We want to ignore removed tasks
+            or_(TI.state.is_(None), TI.state != State.REMOVED),
+        )
+        .all()
+    )
+    xcoms = (
+        session.query(XCom, DR.id)
+        .join(
+            DR,
+            and_(XCom.dag_id == DR.dag_id, XCom.execution_date == DR.execution_date),
+        )
+        .filter(
+            DR.id.in_(dag_run_ids),
+            XCom.key.in_([TEST_STATUS_KEY, LOG_URL_KEY]),
+        )
+        .all()
+    )
+
+    xcom_values = {}
+    for (xcom, dag_run_id) in xcoms:
+        xcom_values[(dag_run_id, xcom.task_id, xcom.key)] = xcom.value
+
+    results = {dag_run_id: [] for dag_run_id in dag_run_ids}
+    for (ti, dag_run_id) in tis:
+        test_status = xcom_values.get((dag_run_id, ti.task_id, TEST_STATUS_KEY))
+        log_url = xcom_values.get((dag_run_id, ti.task_id, LOG_URL_KEY))
+
+        # if error extracting state return error logs, else return underlying task
+        log_url = ti.log_url if log_url == "unknown" else log_url
+
+        results[dag_run_id].append(
+            {
+                "id": ti.job_id,
+                "name": ti.task_id,
+                "log_url": log_url,
+                "test_status": test_status,
+            }
+        )
+    return results
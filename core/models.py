@@ -0,0 +1,313 @@
+from airflow import settings
+from airflow.models import DagRun
+from airflow.models.base import ID_LEN
+from airflow.utils import timezone
+from airflow.utils.db import provide_session
+from airflow.utils.sqlalchemy import UtcDateTime
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, Text
+from sqlalchemy import and_, inspect, or_
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
+
+import json
+
+# Plugin-owned tables live on their own declarative base so that Airflow's
+# initdb/resetdb and the DAG deletion in Report.delete_dag leave them alone
+Base = declarative_base()
+
+
+def create_tables(engine=None):
+    """
+    Creates the plugin-owned tables and indexes that do not exist yet.  This
+    runs from `bin/setup create_tables`, never while serving or poking, so
+    workers need no DDL rights.
+    """
+    engine = engine or settings.engine
+    Base.metadata.create_all(engine)
+    # create_all skips the indexes added to tables that already exist
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        names = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in names:
+                index.create(engine)
+
+
+class ReportRecord(Base):
+    """
+    A report configuration.  Looked up fields are stored in indexed columns,
+    everything else in the JSON definition.
+    """
+
+    __tablename__ = "rb_status_report"
+
+    id = Column(Integer, primary_key=True)
+    report_id = Column(String(ID_LEN), nullable=False, unique=True)
+    report_title_id = Column(String(ID_LEN), nullable=False, unique=True)
+    name = Column(String(ID_LEN), nullable=False, unique=True)
+    definition = Column(Text, nullable=False)
+
+    tests = relationship(
+        "ReportTestRecord",
+        order_by="ReportTestRecord.position",
+        cascade="all, delete-orphan",
+    )
+
+
+class ReportTestRecord(Base):
+    """
+    Membership of a test (a monitored task) in a report
+    """
+
+    __tablename__ = "rb_status_report_test"
+
+    report_pk = Column(
+        Integer, ForeignKey("rb_status_report.id", ondelete="CASCADE"), primary_key=True
+    )
+    position = Column(Integer, primary_key=True)
+    dag_id = Column(String(ID_LEN), nullable=False)
+    task_id = Column(String(ID_LEN), nullable=False)
+
+    __table_args__ = (Index("idx_rb_status_report_test_dag_task", dag_id, task_id),)
+
+    @property
+    def test(self):
+        """ The test as stored in report definitions (dag_id.task_id) """
+        return f"{self.dag_id}.{self.task_id}"
+
+
+class StatusSnapshot(Base):
+    """
+    The status of a report's latest run, written once at the end of the
+    run so the status page does not re-derive it from task instances and
+    XComs.  Snapshots provide the same id, passed, updated and errors()
+    interface as ReportInstance.
+    """
+
+    __tablename__ = "rb_status_snapshot"
+
+    dag_id = Column(String(ID_LEN), primary_key=True)
+    dag_run_id = Column(Integer, nullable=False)
+    execution_date = Column(UtcDateTime, nullable=False)
+    passed = Column(Boolean, nullable=True)
+    failed_tests = Column(Text, nullable=False, default="[]")
+
+    @property
+    def id(self):
+        return self.dag_run_id
+
+    @property
+    def updated(self):
+        return self.execution_date
+
+    def errors(self):
+        """ The failing tests with [id, name, log_url, test_status] """
+        return json.loads(self.failed_tests)
+
+    @classmethod
+    @provide_session
+    def save(cls, ri, session=None):
+        """
+        Stores the status of a ReportInstance unless a newer run of the
+        report already has a snapshot
+        """
+        snapshot = session.query(cls).filter(cls.dag_id == ri.dag_id).one_or_none()
+        if snapshot is None:
+            snapshot = cls(dag_id=ri.dag_id)
+            session.add(snapshot)
+        elif snapshot.execution_date > ri.updated:
+            return
+
+        snapshot.dag_run_id = ri.id
+        snapshot.execution_date = ri.updated
+        snapshot.passed = ri.passed
+        snapshot.failed_tests = json.dumps(ri.errors())
+
+    @classmethod
+    @provide_session
+    def get_many(cls, dag_ids, session=None):
+        """ Returns a dict of dag_id to the snapshot of each report """
+        if not dag_ids:
+            return {}
+        snapshots = session.query(cls).filter(cls.dag_id.in_(dag_ids)).all()
+        return {snapshot.dag_id: snapshot for snapshot in snapshots}
+
+
+class TaskStateRecord(Base):
+    """
+    The latest state of a test's task instance as last read by a sensor,
+    shared between worker processes by the database backed task state cache.
+    since is the lookback bound the state was read with.
+    """
+
+    __tablename__ = "rb_status_task_state"
+
+    dag_id = Column(String(ID_LEN), primary_key=True)
+    task_id = Column(String(ID_LEN), primary_key=True)
+    since = Column(UtcDateTime, nullable=True)
+    execution_date = Column(UtcDateTime, nullable=True)
+    state = Column(String(20), nullable=True)
+    checked_at = Column(UtcDateTime, nullable=False)
+
+
+class TestStateRecord(Base):
+    """
+    The state of the latest run of a test (a monitored task), recorded by
+    the test's own callbacks so sensors do not need to poll task_instance
+    """
+
+    __tablename__ = "rb_status_test_state"
+
+    dag_id = Column(String(ID_LEN), primary_key=True)
+    task_id = Column(String(ID_LEN), primary_key=True)
+    execution_date = Column(UtcDateTime, nullable=False)
+    state = Column(String(20), nullable=True)
+
+    @classmethod
+    @provide_session
+    def record(cls, ti, session=None):
+        """
+        Stores the state of a TaskInstance unless a later run of the task
+        was already recorded
+        """
+        record = session.query(cls).get((ti.dag_id, ti.task_id))
+        if record is None:
+            record = cls(dag_id=ti.dag_id, task_id=ti.task_id)
+            session.add(record)
+        elif record.execution_date > ti.execution_date:
+            return
+
+        record.execution_date = ti.execution_date
+        record.state = ti.state
+
+
+class ResultRecord(Base):
+    """
+    The result of a test in a run of a report, written by the report's
+    sensors in place of XComs.  A report run's results are read back with
+    one query on the dag_run_id index.
+    """
+
+    __tablename__ = "rb_status_result"
+
+    id = Column(Integer, primary_key=True)
+    dag_run_id = Column(Integer, nullable=False)
+    test_dag_id = Column(String(ID_LEN), nullable=False)
+    test_task_id = Column(String(ID_LEN), nullable=False)
+    status = Column(Boolean, nullable=True)
+    log_url = Column(Text, nullable=True)
+    observed_at = Column(UtcDateTime, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "idx_rb_status_result_run_test",
+            dag_run_id,
+            test_dag_id,
+            test_task_id,
+            unique=True,
+        ),
+        # Serves the lookups of a test's latest results (see latest_of_dag)
+        Index(
+            "idx_rb_status_result_test_observed",
+            test_dag_id,
+            test_task_id,
+            observed_at,
+        ),
+    )
+
+    @property
+    def test(self):
+        """ The test as stored in report definitions (dag_id.task_id) """
+        return f"{self.test_dag_id}.{self.test_task_id}"
+
+    @classmethod
+    @provide_session
+    def save_many(cls, dag_run_id, results, session=None):
+        """
+        Stores the results of tests in a report run, replacing earlier
+        results of the same tests
+
+        :param results: a dict of test to (status, log_url)
+        :type results: dict
+        """
+        records = session.query(cls).filter(cls.dag_run_id == dag_run_id)
+        if len(results) == 1:
+            (test,) = results
+            (dag_id, task_id) = test.split(".", 1)
+            records = records.filter(
+                cls.test_dag_id == dag_id, cls.test_task_id == task_id
+            )
+        records = {record.test: record for record in records}
+
+        observed_at = timezone.utcnow()
+        for (test, (status, log_url)) in results.items():
+            record = records.get(test)
+            if record is None:
+                (dag_id, task_id) = test.split(".", 1)
+                record = cls(
+                    dag_run_id=dag_run_id, test_dag_id=dag_id, test_task_id=task_id
+                )
+                session.add(record)
+            record.status = status
+            record.log_url = log_url
+            record.observed_at = observed_at
+
+    @classmethod
+    @provide_session
+    def tests_of(cls, dag_run_id, known=False, session=None):
+        """
+        The tests that have a result in a report run, with known only
+        those that passed or failed
+        """
+        rows = session.query(cls.test_dag_id, cls.test_task_id).filter(
+            cls.dag_run_id == dag_run_id
+        )
+        if known:
+            rows = rows.filter(cls.status.isnot(None))
+        return {f"{dag_id}.{task_id}" for (dag_id, task_id) in rows}
+
+    @classmethod
+    @provide_session
+    def latest_of_dag(cls, dag_id, tests, since=None, runs_since=None, session=None):
+        """
+        Returns the newest result of each of tests recorded by the runs of
+        the DAG dag_id, as a dict of test to (status, log_url).  With since,
+        only results observed from then on are considered, and with
+        runs_since only those of runs executed from then on.
+        """
+        criteria = []
+        for test in set(tests):
+            (test_dag_id, test_task_id) = test.split(".", 1)
+            criteria.append(
+                and_(cls.test_dag_id == test_dag_id, cls.test_task_id == test_task_id)
+            )
+        if not criteria:
+            return {}
+
+        records = (
+            session.query(cls)
+            .join(DagRun, DagRun.id == cls.dag_run_id)
+            .filter(DagRun.dag_id == dag_id, or_(*criteria))
+        )
+        if since is not None:
+            records = records.filter(cls.observed_at >= since)
+        if runs_since is not None:
+            records = records.filter(DagRun.execution_date >= runs_since)
+        # Newer results replace older ones
+        return {
+            record.test: (record.status, record.log_url)
+            for record in records.order_by(cls.observed_at)
+        }
+
+    @classmethod
+    @provide_session
+    def delete_before(cls, dag_id, before, session=None):
+        """ Deletes the results of the runs of dag_id executed before a datetime """
+        run_ids = session.query(DagRun.id).filter(
+            DagRun.dag_id == dag_id, DagRun.execution_date < before
+        )
+        return (
+            session.query(cls)
+            .filter(cls.dag_run_id.in_(run_ids.subquery()))
+            .delete(synchronize_session=False)
+        )
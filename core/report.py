@@ -10,145 +10,123 @@ from airflow.utils import timezone
 from airflow.utils.state import State
 from sqlalchemy import or_
 from airflow.models.serialized_dag import SerializedDagModel
+from rb_status_plugin.core.models import ResultRecord, StatusSnapshot
 
 
 STORE_SERIALIZED_DAGS = conf.getboolean("core", "store_serialized_dags", fallback=False)
 
 
-class Report:
-    """
-    Report holds a status report configuration.  It is used to build
-    status report DAGs
-    """
-
-    def __init__(self, name):
-        self.name = name
-        self.__report_id = None
-        self.__report_title = None
-        self.__report_title_id = None
-        self.__description = None
-        self.__owner_name = None
-        self.__owner_email = None
-        self.__subscribers = None
-        self.__tests = None
-        self.__schedule_type = None
-        self.__schedule_time = None
-        self.__schedule_week_day = None
-        self.__schedule = None
-
-    @property
-    def report_title(self):
-        """ Title of the report """
-        return self.__report_title
+def _field(key, doc):
+    """ A report property read from and written to the report's definition """
 
-    @report_title.setter
-    def report_title(self, val):
-        self.__report_title = val
+    def fget(self):
+        return self._data.get(key)
 
-    @property
-    def report_id(self):
-        """ Unique Id of the report """
-        return self.__report_id
+    def fset(self, val):
+        self._data[key] = val
 
-    @report_id.setter
-    def report_id(self, val):
-        self.__report_id = val
+    return property(fget, fset, doc=doc)
 
-    @property
-    def report_title_id(self):
-        """ Formatted title of the report for url path """
-        return self.__report_title_id
 
-    @report_title_id.setter
-    def report_title_id(self, val):
-        self.__report_title_id = val
+def _int_field(key, doc):
+    """ A whole number report property, None when it is not set """
 
-    @property
-    def description(self):
-        """ Description of the report """
-        return self.__description
+    def fget(self):
+        val = self._data.get(key)
+        if val is None or val == "":
+            return None
+        return int(val)
 
-    @description.setter
-    def description(self, val):
-        self.__description = val
+    def fset(self, val):
+        self._data[key] = val
 
-    @property
-    def owner_name(self):
-        """ Name of the report owner """
-        return self.__owner_name
+    return property(fget, fset, doc=doc)
 
-    @owner_name.setter
-    def owner_name(self, val):
-        self.__owner_name = val
 
-    @property
-    def owner_email(self):
-        """ Email address of the report owner """
-        return self.__owner_email
+class Report:
+    """
+    Report holds a status report configuration.  It is used to build
+    status report DAGs
 
-    @owner_email.setter
-    def owner_email(self, val):
-        self.__owner_email = val
+    The configuration is kept as the report's JSON definition (a dict),
+    without copying it field by field, and fields that are costly to
+    decode are only decoded when they are first read.
+    """
 
-    @property
-    def subscribers(self):
-        """ Emails that the report will go to """
-        return self.__subscribers
+    __slots__ = ("name", "_data", "_schedule_time")
 
-    @subscribers.setter
-    def subscribers(self, val):
-        self.__subscribers = val
+    def __init__(self, name, data=None):
+        self.name = name
+        self._data = {} if data is None else data
+        self._schedule_time = None
+
+    def __copy__(self):
+        return type(self)(self.name, dict(self._data))
+
+    report_title = _field("report_title", "Title of the report")
+    report_id = _field("report_id", "Unique Id of the report")
+    report_title_id = _field(
+        "report_title_id", "Formatted title of the report for url path"
+    )
+    description = _field("description", "Description of the report")
+    owner_name = _field("owner_name", "Name of the report owner")
+    owner_email = _field("owner_email", "Email address of the report owner")
+    subscribers = _field("subscribers", "Emails that the report will go to")
+    schedule_type = _field("schedule_type", "Type of schedule (daily, weekly, custom)")
+    schedule = _field("schedule", "The schedule when the report will run")
+    tests = _field("tests", "The tests run in the report")
+    batch_tests = _field(
+        "batch_tests", "Whether all tests are checked by a single StatusBatchSensor"
+    )
+    max_poke_interval = _field(
+        "max_poke_interval", "Longest wait in seconds between two sensor pokes"
+    )
+    pool = _field("pool", "Pool the report's tasks run in")
+    sensor_mode = _field("sensor_mode", "Mode of the report's sensors")
+    poke_interval = _int_field(
+        "poke_interval", "Seconds between the first pokes of a sensor"
+    )
+    timeout = _int_field("timeout", "Seconds a sensor waits before failing")
+    priority_weight = _int_field(
+        "priority_weight", "Priority of the report's tasks in the executor queue"
+    )
 
     @property
-    def schedule_type(self):
-        """ Type of schedule (daily, weekly, custom) """
-        return self.__schedule_type
-
-    @schedule_type.setter
-    def schedule_type(self, val):
-        self.__schedule_type = val
+    def definition(self):
+        """ A copy of the report's JSON definition """
+        return dict(self._data)
 
     @property
     def schedule_time(self):
         """ Hour:Min of schedule (for daily & weekly) """
-        return self.__schedule_time
+        if self._schedule_time is None:
+            val = self._data.get("schedule_time")
+            schedule_type = self.schedule_type or ""
+            if val and ("daily" in schedule_type or "weekly" in schedule_type):
+                self._schedule_time = datetime.datetime.strptime(val, "%H:%M")
+        return self._schedule_time
 
     @schedule_time.setter
     def schedule_time(self, val):
-        self.__schedule_time = datetime.datetime.strptime(val, "%H:%M")
+        self._data["schedule_time"] = val
+        self._schedule_time = None
 
     @property
     def schedule_week_day(self):
         """ Day (0-6) which a weekly schedule should run """
-        return self.__schedule_week_day
+        if "weekly" not in (self.schedule_type or ""):
+            return None
+        return self._data.get("schedule_week_day")
 
     @schedule_week_day.setter
     def schedule_week_day(self, val):
-        self.__schedule_week_day = val
-
-    @property
-    def schedule(self):
-        """ The schedule when the report will run """
-        return self.__schedule
-
-    @schedule.setter
-    def schedule(self, val):
-        self.__schedule = val
+        self._data["schedule_week_day"] = val
 
     @property
     def dag_id(self):
         """ Returns a DAG ID based on the name of this report """
         return inflection.underscore(inflection.parameterize(f"rb status {self.name}"))
 
-    @property
-    def tests(self):
-        """ The tests run in the report """
-        return self.__tests
-
-    @tests.setter
-    def tests(self, val):
-        self.__tests = val
-
     @property
     def is_paused(self):
         return models.DagModel.get_dagmodel(self.dag_id).is_paused
@@ -216,6 +194,12 @@ class Report:
         ):
             SerializedDagModel.remove_dag(dag_id=self.dag_id, session=session)
 
+        # Test results are keyed by DagRun id, so go before the DagRuns
+        dag_run_ids = session.query(DagRun.id).filter(DagRun.dag_id == self.dag_id)
+        session.query(ResultRecord).filter(
+            ResultRecord.dag_run_id.in_(dag_run_ids)
+        ).delete(synchronize_session=False)
+
         # noinspection PyUnresolvedReferences,PyProtectedMember
         for model in models.base.Base._decl_class_registry.values():
             if hasattr(model, "dag_id"):
@@ -234,6 +218,11 @@ class Report:
             models.ImportError.filename == dag.fileloc
         ).delete(synchronize_session="fetch")
 
+        # Plugin-owned tables are not part of Airflow's class registry
+        session.query(StatusSnapshot).filter(
+            StatusSnapshot.dag_id == self.dag_id
+        ).delete(synchronize_session="fetch")
+
     @provide_session
     def delete_report_variable(self, report_prefix, session=None):
         """
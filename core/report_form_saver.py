@@ -1,20 +1,30 @@
-from airflow.models import Variable
-import json
 import logging
 import re
+from airflow.sensors.base_sensor_operator import BaseSensorOperator
 from flask import flash
 from inflection import parameterize
 import pendulum
-from rb_status_plugin.core.report_repo import VariablesReportRepo
+from rb_status_plugin.core.report_repo import get_report_repo
+from rb_status_plugin.core.status_cache import status_cache
 
 
 class ReportFormSaver:
     """
-    A class for properly saving a report's form into an airflow variable.
+    A class for properly saving a report's form into the configured report repo.
     """
 
     report_dict = {}
 
+    # Fields that may be left empty on the form
+    optional_fields = (
+        "subscribers",
+        "pool",
+        "sensor_mode",
+        "poke_interval",
+        "timeout",
+        "priority_weight",
+    )
+
     def __init__(self, form):
         """
         :param self.report_dict: a mapping of form attributes to inputted values
@@ -31,6 +41,12 @@ class ReportFormSaver:
         self.report_dict["owner_name"] = self.form.owner_name.data
         self.report_dict["owner_email"] = self.form.owner_email.data
         self.report_dict["tests"] = self.form.tests.data
+        self.report_dict["batch_tests"] = bool(self.form.batch_tests.data)
+        self.report_dict["pool"] = self.form.pool.data or None
+        self.report_dict["sensor_mode"] = self.form.sensor_mode.data or None
+        self.report_dict["poke_interval"] = self.form.poke_interval.data
+        self.report_dict["timeout"] = self.form.timeout.data
+        self.report_dict["priority_weight"] = self.form.priority_weight.data
         self.report_dict["schedule_type"] = self.form.schedule_type.data
         self.report_dict["schedule_timezone"] = self.form.schedule_timezone.data
         if self.report_dict["schedule_type"] == "custom":
@@ -56,8 +72,15 @@ class ReportFormSaver:
 
         # if report looks good, save it
         if self.validate_unique_report(report_exists):
-            report_json = json.dumps(self.report_dict)
-            Variable.set(key=self.report_dict["report_id"], value=report_json)
+            report_dict = dict(self.report_dict)
+            if report_exists:
+                # keep the settings that are not on the form
+                report = get_report_repo().get_report(report_dict["report_id"])
+                if report:
+                    report_dict = {**report.definition, **report_dict}
+            get_report_repo().save(report_dict)
+            # show the new or edited report on the status page right away
+            status_cache.clear()
             return True
         return False
 
@@ -71,12 +94,16 @@ class ReportFormSaver:
         Return boolean on whether report is unique.
         """
 
-        if self.check_empty_fields() and self.emails_formatted:
+        if (
+            self.check_empty_fields()
+            and self.check_sensor_fields()
+            and self.emails_formatted
+        ):
             if report_exists:
                 self.report_dict["report_id"] = self.form.report_id.data
             else:
                 self.report_dict["report_id"] = (
-                    f"{VariablesReportRepo.report_prefix}"
+                    f"{get_report_repo().report_prefix}"
                     f"""{self.report_dict["report_title"]}"""
                 )
                 if not self.check_unique_field(report_exists, "report_id"):
@@ -98,11 +125,17 @@ class ReportFormSaver:
         Return boolean on whether entry is unique.
         """
 
-        for report in VariablesReportRepo.list():
+        repo = get_report_repo()
+        lookups = {
+            "report_id": repo.get_report,
+            "report_title_id": repo.get_by_title_id,
+        }
+        report = lookups[field_name](self.report_dict[field_name])
+        if report:
             # dont check against the report being editted
             if report_exists:
                 if getattr(report, "report_id") == self.report_dict["report_id"]:
-                    continue
+                    return True
 
             # alert user that field_name is being used by another report
             if str(getattr(report, field_name)) == self.report_dict[field_name]:
@@ -141,17 +174,40 @@ class ReportFormSaver:
 
     def check_empty_fields(self):
         """
-        Check for input in each field (except subscribers).
+        Check for input in each field (except optional_fields).
 
         Return boolean on whether fields are filled out.
         """
 
         form_completed = True
         for field_name in self.report_dict.keys():
-            if field_name != "subscribers":
+            if field_name not in self.optional_fields:
                 form_completed = form_completed and self.check_empty_field(field_name)
         return form_completed
 
+    def check_sensor_fields(self):
+        """
+        Check that poke_interval and timeout are at least 1 second and that
+        sensor_mode is a mode the sensors support, when they are set.
+
+        Return boolean on whether the sensor settings are valid.
+        """
+
+        sensor_fields_valid = True
+        for field_name in ("poke_interval", "timeout"):
+            value = self.report_dict[field_name]
+            if value is not None and (not isinstance(value, int) or value < 1):
+                logging.info(f"Error: {field_name} must be at least 1 second.")
+                flash(f"Error: {field_name} must be at least 1 second.")
+                sensor_fields_valid = False
+
+        sensor_mode = self.report_dict["sensor_mode"]
+        if sensor_mode and sensor_mode not in BaseSensorOperator.valid_modes:
+            logging.info(f"Error: sensor_mode ({sensor_mode}) is not valid.")
+            flash(f"Error: sensor_mode ({sensor_mode}) is not valid.")
+            sensor_fields_valid = False
+        return sensor_fields_valid
+
     def format_emails(self):
         """
         Parse, transform, and vaildate emails.
@@ -257,4 +313,10 @@ class ReportFormSaver:
             form.schedule_time.data = requested_report.schedule_time
             form.schedule_week_day.data = str(requested_report.schedule_week_day)
         form.tests.data = requested_report.tests
+        form.batch_tests.data = bool(requested_report.batch_tests)
+        form.pool.data = requested_report.pool or ""
+        form.sensor_mode.data = requested_report.sensor_mode or ""
+        form.poke_interval.data = requested_report.poke_interval
+        form.timeout.data = requested_report.timeout
+        form.priority_weight.data = requested_report.priority_weight
         return form
@@ -1,7 +1,8 @@
 from airflow.utils.db import provide_session
 from airflow.utils.state import State
-from airflow import models
-import logging
+from airflow.models import DagRun
+from sqlalchemy import and_, func
+from rb_status_plugin.core.helpers.test_results_helper import get_test_results
 
 
 class ReportInstance:
@@ -10,8 +11,10 @@ class ReportInstance:
     with a few plugin-specific helpers
     """
 
-    def __init__(self, dag_run):
+    def __init__(self, dag_run, test_results=None):
         self.dag_run = dag_run
+        self._test_results = test_results
+        self._errors = None
         self._passed = None
 
     @property
@@ -32,6 +35,15 @@ class ReportInstance:
     def updated(self):
         return self.dag_run.execution_date
 
+    def refresh(self):
+        """
+        Drops the cached test results, errors and status so they are
+        evaluated again on next access
+        """
+        self._test_results = None
+        self._errors = None
+        self._passed = None
+
     def calculate_passed(self, errs):
         """
         Calculates the overall report status.
@@ -63,36 +75,23 @@ class ReportInstance:
         A none value denotes an operational failure which prevented task instance
         evaluation.
 
+        Test results are taken from those bulk loaded with the instance (see
+        get_latest_many), and are otherwise loaded for this DagRun alone.
+        The errors are computed once and cached until refresh() is called.
+
         :return: returns a list containing error dicts with [id, name,
             description, error_type]
         :rtype: list
         """
-        failed = []
-        for ti in self.dag_run.get_task_instances():
-            # We want to ignored removed tasks and non-test tasks
-            if (ti.operator != "StatusSensor") or ti.state == State.REMOVED:
-                continue
-
-            test_status = ti.xcom_pull(
-                key="rb_status_test_task_status", task_ids=ti.task_id
-            )
-            log_url = ti.xcom_pull(key="rb_status_task_log_url", task_ids=ti.task_id)
-
-            # if error extracting state return error logs, else return underlying task
-            log_url = ti.log_url if log_url == "unknown" else log_url
-
-            if not test_status:
-                ti.refresh_from_db()
-
-                failed.append(
-                    {
-                        "id": ti.job_id,
-                        "name": ti.task_id,
-                        "log_url": log_url,
-                        "test_status": test_status,
-                    }
+        if self._errors is None:
+            if self._test_results is None:
+                self._test_results = get_test_results([self.dag_run]).get(
+                    self.id, []
                 )
-        return failed
+            self._errors = [
+                result for result in self._test_results if not result["test_status"]
+            ]
+        return self._errors
 
     @classmethod
     @provide_session
@@ -103,20 +102,51 @@ class ReportInstance:
         NOTE: The include_externally_triggered is set to True, which is
         the opposite of the Dag object method of the same name.
         """
-
-        dag_run = models.dag.get_last_dagrun(
-            report.dag_id, session, include_externally_triggered
+        latest = cls.get_latest_many(
+            [report], include_externally_triggered, session=session
         )
+        if report.dag_id not in latest:
+            raise LookupError(f"Could not find finished DagRun for {report.dag_id}")
+        return latest[report.dag_id]
 
-        # Retry until we find a finished DAG or there are no more
-        while True:
-            if dag_run is None:
-                raise LookupError(f"Could not find finished DagRun for {report.dag_id}")
-            if dag_run.get_state() in State.finished():
-                break
-            logging.info(
-                f"DagRun {dag_run.id} is {dag_run.get_state()} ... trying again."
+    @classmethod
+    @provide_session
+    def get_latest_many(cls, reports, include_externally_triggered=True, session=None):
+        """
+        Gets the last finished ReportInstance for each of the given Reports
+        with a single grouped query, rather than walking back through
+        previous DagRuns one report at a time.  The test results of every
+        returned instance are bulk loaded alongside.
+
+        :return: a dict of dag_id to ReportInstance.  Reports without a
+            finished DagRun are left out.
+        :rtype: dict
+        """
+        dag_ids = list({report.dag_id for report in reports})
+        if not dag_ids:
+            return {}
+
+        DR = DagRun
+        latest = session.query(
+            DR.dag_id, func.max(DR.execution_date).label("execution_date")
+        ).filter(DR.dag_id.in_(dag_ids), DR.state.in_(State.finished()))
+        if not include_externally_triggered:
+            latest = latest.filter(DR.external_trigger.is_(False))
+        latest = latest.group_by(DR.dag_id).subquery()
+
+        dag_runs = (
+            session.query(DR)
+            .join(
+                latest,
+                and_(
+                    DR.dag_id == latest.c.dag_id,
+                    DR.execution_date == latest.c.execution_date,
+                ),
             )
-            dag_run = dag_run.get_previous_dagrun()
-
-        return cls(dag_run)
+            .all()
+        )
+        test_results = get_test_results(dag_runs, session=session)
+        return {
+            dag_run.dag_id: cls(dag_run, test_results.get(dag_run.id, []))
+            for dag_run in dag_runs
+        }
@@ -1,10 +1,12 @@
 from flask_admin.model import BaseModelView
 
-from wtforms.validators import DataRequired, Email, Optional
+from wtforms.validators import DataRequired, Email, NumberRange, Optional
 from wtforms_components import TimeField
 from wtforms.form import Form
 from wtforms import widgets
 from wtforms import (
+    BooleanField,
+    IntegerField,
     StringField,
     TextAreaField,
     SelectMultipleField,
@@ -13,7 +15,8 @@ from wtforms import (
 )
 from flask_admin.helpers import get_form_data
 from rb_status_plugin.core.helpers.list_tasks_helper import get_all_test_choices
-from rb_status_plugin.core.report_repo import VariablesReportRepo
+from rb_status_plugin.core.helpers.list_pools_helper import get_pool_choices
+from rb_status_plugin.core.report_repo import get_report_repo
 from rb_status_plugin.core.report_form_saver import ReportFormSaver
 
 import logging
@@ -180,6 +183,13 @@ class ReportModel(BaseModelView):
                 widget=Select2ManyWidget(),
                 validators=[DataRequired()],
             )
+            batch_tests = BooleanField(
+                ("Check tests in one task"),
+                description=(
+                    "Check all tests with a single sensor task instead of one\
+                 task per test. Recommended for reports with many tests."
+                ),
+            )
             schedule_type = SelectField(
                 ("Schedule"),
                 description=("Select how you want to schedule the report"),
@@ -216,16 +226,54 @@ class ReportModel(BaseModelView):
                 # widget=BS3TextFieldWidget(),
                 # validators=[DataRequired()],
             )
+            pool = SelectField(
+                ("Pool"),
+                description=(
+                    "Pool whose slots the report's tasks take. Use a pool to\
+                 cap the slots the report uses at once."
+                ),
+                choices=None,
+                widget=Select2Widget(),
+                validators=[Optional()],
+            )
+            sensor_mode = SelectField(
+                ("Sensor mode"),
+                description=(
+                    "Reschedule frees the worker slot between pokes, poke keeps\
+                 it. Leave empty to use the sensor_mode option."
+                ),
+                choices=[
+                    ("", "Default"),
+                    ("reschedule", "Reschedule"),
+                    ("poke", "Poke"),
+                ],
+                widget=Select2Widget(),
+                validators=[Optional()],
+            )
+            poke_interval = IntegerField(
+                ("Poke interval"),
+                description="Seconds between the first pokes of a test's sensor",
+                validators=[Optional(), NumberRange(min=1)],
+            )
+            timeout = IntegerField(
+                ("Timeout"),
+                description="Seconds a sensor waits for its test before failing",
+                validators=[Optional(), NumberRange(min=1)],
+            )
+            priority_weight = IntegerField(
+                ("Priority weight"),
+                description="Tasks of reports with a higher weight are queued first",
+                validators=[Optional()],
+            )
 
         # Do something
         return ReportForm
 
     def get_list(self, page, sort_field, sort_desc, search, filters, page_size=None):
-        print(VariablesReportRepo.list()[0].subscribers)
-        return None, VariablesReportRepo.list()
+        return None, get_report_repo().list()
 
     def get_one(self, id):
-        report = VariablesReportRepo.get_report(id)
+        report = get_report_repo().get_report(id)
         if not report:
             return None
 
@@ -242,6 +290,7 @@ class ReportModel(BaseModelView):
         """
         form_obj = self._create_form_class(get_form_data(), obj=obj)
         form_obj.tests.choices = get_all_test_choices()
+        form_obj.pool.choices = get_pool_choices()
         return form_obj
 
     def edit_form(self, obj=None):
@@ -252,6 +301,7 @@ class ReportModel(BaseModelView):
         """
         form_obj = self._edit_form_class(get_form_data(), obj=obj)
         form_obj.tests.choices = get_all_test_choices()
+        form_obj.pool.choices = get_pool_choices()
         return form_obj
 
     def create_model(self, form):
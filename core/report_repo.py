@@ -1,9 +1,68 @@
+import copy
+import hashlib
 import json
+import logging
+import os
 import re
 import abc
+import threading
+import time
+from airflow.configuration import AIRFLOW_HOME, conf
+from airflow.exceptions import AirflowConfigException
 from airflow.utils.db import provide_session
 from airflow.models import Variable
+from sqlalchemy.orm import selectinload
 from rb_status_plugin.core.report import Report
+from rb_status_plugin.core.models import ReportRecord, ReportTestRecord
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+class ReportTestIndex:
+    """
+    Reverse index from a test (dag_id, task_id) to the ids of the
+    reports that include it
+    """
+
+    def __init__(self, reports=()):
+        self._lock = threading.Lock()
+        self._tests = {}
+        self._reports = {}
+        for report in reports:
+            self.add(report.report_id, report.tests)
+
+    def add(self, report_id, tests):
+        """ Indexes a report's tests, replacing what was indexed for it """
+        keys = set()
+        for test in tests or []:
+            key = tuple(test.split(".", 1))
+            if len(key) == 2:
+                keys.add(key)
+
+        with self._lock:
+            self._remove(report_id)
+            self._reports[report_id] = keys
+            for key in keys:
+                self._tests.setdefault(key, set()).add(report_id)
+
+    def remove(self, report_id):
+        """ Drops a report from the index """
+        with self._lock:
+            self._remove(report_id)
+
+    def _remove(self, report_id):
+        for key in self._reports.pop(report_id, ()):
+            report_ids = self._tests[key]
+            report_ids.discard(report_id)
+            if not report_ids:
+                del self._tests[key]
+
+    def get(self, dag_id, task_id):
+        """ Returns the sorted ids of the reports including dag_id.task_id """
+        return sorted(self._tests.get((dag_id, task_id), ()))
 
 
 class ReportRepo(abc.ABC):
@@ -12,6 +71,16 @@ class ReportRepo(abc.ABC):
     they intend on returning lists of reports from a repository.
     """
 
+    # Report ids (and the variables of VariablesReportRepo) carry this prefix
+    report_prefix = "rb_status_"
+
+    # The reverse test index is updated in place when reports are saved or
+    # deleted through the repo, and rebuilt from list() once it is older
+    # than test_index_ttl seconds to pick up changes made by other processes
+    test_index_ttl = 30
+    _test_index = None
+    _test_index_built = 0
+
     @classmethod
     @abc.abstractmethod
     def list(self):
@@ -24,6 +93,66 @@ class ReportRepo(abc.ABC):
         """ Gets a particular report from the repo """
         pass
 
+    @classmethod
+    @abc.abstractmethod
+    def get_report(self, report_id):
+        """ Gets a report by its report_id """
+        pass
+
+    @classmethod
+    @abc.abstractmethod
+    def get_by_title_id(self, report_title_id):
+        """ Gets a report by its report_title_id """
+        pass
+
+    @classmethod
+    @abc.abstractmethod
+    def save(self, report_dict):
+        """ Creates or replaces a report from its JSON definition """
+        pass
+
+    @classmethod
+    @abc.abstractmethod
+    def delete(self, name):
+        """ Deletes a report by name """
+        pass
+
+    @classmethod
+    def reports_for_test(cls, dag_id, task_id):
+        """ Returns the ids of the reports that include the test dag_id.task_id """
+        return cls.test_index().get(dag_id, task_id)
+
+    @classmethod
+    def test_index(cls):
+        """ Returns the repo's reverse test index, building it if needed """
+        now = time.monotonic()
+        if cls._test_index is None or now - cls._test_index_built > cls.test_index_ttl:
+            cls._test_index = ReportTestIndex(cls.list())
+            cls._test_index_built = now
+        return cls._test_index
+
+    @classmethod
+    def index_report(cls, report_dict):
+        """ Updates the test index for a saved report """
+        if cls._test_index is not None:
+            cls._test_index.add(report_dict["report_id"], report_dict["tests"])
+
+    @classmethod
+    def unindex_report(cls, report_id):
+        """ Updates the test index for a deleted report """
+        if cls._test_index is not None:
+            cls._test_index.remove(report_id)
+
+    @classmethod
+    def report_name(cls, report_id):
+        """ Returns the report name of a report_id """
+        return report_id[len(cls.report_prefix) :]
+
+    @staticmethod
+    def to_report(name, v):
+        """ Generates report objects from a report's JSON definition """
+        return Report(name, v)
+
 
 class VariablesReportRepo(ReportRepo):
     """
@@ -32,25 +161,67 @@ class VariablesReportRepo(ReportRepo):
     output report objects.
     """
 
-    # Only variables with this prefix will be parsed
-    report_prefix = "rb_status_"
+    # Parsed reports are cached per process and reused for as long as
+    # the generation stamp of the report variables is unchanged
+    _cache_lock = threading.Lock()
+    _cache_stamp = None
+    _cache_reports = []
 
     @classmethod
     @provide_session
     def list(cls, session=None):
         """ Return a list of all matching reports in variables """
-        reports = []
-        for (name, val) in cls.each_from_db(session):
-            r = cls.to_report(name, val)
-            reports.append(r)
+        stamp = cls.generation_stamp(session)
+        with cls._cache_lock:
+            if stamp != cls._cache_stamp:
+                reports = []
+                for (name, val) in cls.each_from_db(session):
+                    r = cls.to_report(name, val)
+                    reports.append(r)
+
+                cls._cache_reports = reports
+                cls._cache_stamp = stamp
+            return list(cls._cache_reports)
+
+    @classmethod
+    def invalidate(cls):
+        """ Drops the cached reports so the next list() re-parses them """
+        with cls._cache_lock:
+            cls._cache_stamp = None
+            cls._cache_reports = []
 
-        return reports
+    @classmethod
+    def generation_stamp(cls, session):
+        """
+        Returns a checksum of the report variables' current contents.  It
+        is computed from the stored (possibly encrypted) values, without
+        decrypting or decoding them, so any save, delete or in-place edit
+        changes it.  This keeps the cache of every webserver worker and
+        scheduler process consistent with the database.
+        """
+        rows = (
+            session.query(Variable.id, Variable.key, Variable._val)
+            .filter(Variable.key.like(cls.report_prefix_pattern(), escape="\\"))
+            .order_by(Variable.id)
+        )
+        checksum = hashlib.sha1()
+        for (var_id, key, val) in rows:
+            checksum.update(f"{var_id}\0{key}\0{val}\0".encode("utf-8"))
+        return checksum.hexdigest()
+
+    @classmethod
+    def report_prefix_pattern(cls):
+        """ Returns a LIKE pattern matching the keys of report variables """
+        prefix = cls.report_prefix.replace("_", "\\_")
+        return f"{prefix}%"
 
     @classmethod
     @provide_session
     def get_report(cls, lookup_id, session=None):
-        """ Return a list of all matching reports in variables """
-        variable = session.query(Variable).filter(Variable.key == lookup_id,).one()
+        """ Return the report stored under a variable key """
+        variable = (
+            session.query(Variable).filter(Variable.key == lookup_id).one_or_none()
+        )
 
         if not variable:
             return None
@@ -61,14 +232,57 @@ class VariablesReportRepo(ReportRepo):
     @provide_session
     def get(cls, name, session=None):
         """ Get a single report from variables """
-        for (n, val) in cls.each_from_db(session):
-            if n == name:
-                return cls.to_report(n, val)
+        reports = cls.get_many([name], session=session)
+        return reports[0] if reports else None
+
+    @classmethod
+    @provide_session
+    def get_many(cls, names, session=None):
+        """ Get the reports with the given names, looked up by variable key """
+        keys = [cls.report_prefix + name for name in names]
+        if not keys:
+            return []
+
+        variables = session.query(Variable).filter(Variable.key.in_(keys)).all()
+        values = {var.key: var.val for var in variables}
+        return [
+            cls.to_report(name, cls.parse_variable_val(values[key]))
+            for (name, key) in zip(names, keys)
+            if key in values
+        ]
+
+    @classmethod
+    def get_by_title_id(cls, report_title_id):
+        """ Get a single report by its report_title_id """
+        for report in cls.list():
+            if str(report.report_title_id) == report_title_id:
+                return report
+
+    @classmethod
+    def save(cls, report_dict):
+        """ Stores a report's JSON definition in its variable """
+        Variable.set(key=report_dict["report_id"], value=json.dumps(report_dict))
+        cls.invalidate()
+        cls.index_report(report_dict)
+
+    @classmethod
+    def delete(cls, name):
+        """ Deletes the variable of a report """
+        Report(name).delete_report_variable(cls.report_prefix)
+        cls.invalidate()
+        cls.unindex_report(cls.report_prefix + name)
 
     @classmethod
     def each_from_db(cls, session):
-        """ Iterator for Airflow variables """
-        variables = session.query(Variable).all()
+        """
+        Iterator for Airflow report variables.  The prefix is matched
+        in the database so unrelated variables are never loaded.
+        """
+        variables = (
+            session.query(Variable)
+            .filter(Variable.key.like(cls.report_prefix_pattern(), escape="\\"))
+            .all()
+        )
         for var in variables:
             n = cls.parse_variable_name(var.key)
             if n is None:
@@ -77,27 +291,6 @@ class VariablesReportRepo(ReportRepo):
             v = cls.parse_variable_val(var.val)
             yield (n, v)
 
-    @staticmethod
-    def to_report(name, v):
-        """ Generates report objects from variable data """
-        r = Report(name)
-        r.report_id = v["report_id"]
-        r.report_title = v["report_title"]
-        r.report_title_id = v["report_title_id"]
-        r.description = v["description"]
-        r.owner_name = v["owner_name"]
-        r.owner_email = v["owner_email"]
-        r.subscribers = v["subscribers"]
-        r.tests = v["tests"]
-        r.schedule_type = v["schedule_type"]
-        if "daily" in r.schedule_type:
-            r.schedule_time = v["schedule_time"]
-        if "weekly" in r.schedule_type:
-            r.schedule_time = v["schedule_time"]
-            r.schedule_week_day = v["schedule_week_day"]
-        r.schedule = v["schedule"]
-        return r
-
     @staticmethod
     def parse_variable_name(key):
         """
@@ -118,3 +311,265 @@ class VariablesReportRepo(ReportRepo):
             return json.loads(json_val)
         except json.decoder.JSONDecodeError:
             return None
+
+
+class DatabaseReportRepo(ReportRepo):
+    """
+    DatabaseReportRepo stores report configurations in plugin-owned
+    tables.  Reports are looked up through indexed columns and the tests
+    of every report are kept in a membership table indexed by dag_id
+    and task_id.
+    """
+
+    @classmethod
+    @provide_session
+    def list(cls, session=None):
+        """ Return a list of all reports in the report table """
+        records = (
+            session.query(ReportRecord)
+            .options(selectinload(ReportRecord.tests))
+            .order_by(ReportRecord.id)
+            .all()
+        )
+        return [cls.record_to_report(record) for record in records]
+
+    @classmethod
+    @provide_session
+    def get(cls, name, session=None):
+        """ Get a single report by name """
+        return cls.get_by(ReportRecord.name == name, session)
+
+    @classmethod
+    @provide_session
+    def get_report(cls, report_id, session=None):
+        """ Get a single report by its report_id """
+        return cls.get_by(ReportRecord.report_id == report_id, session)
+
+    @classmethod
+    @provide_session
+    def get_by_title_id(cls, report_title_id, session=None):
+        """ Get a single report by its report_title_id """
+        return cls.get_by(ReportRecord.report_title_id == report_title_id, session)
+
+    @classmethod
+    def get_by(cls, criterion, session):
+        record = session.query(ReportRecord).filter(criterion).one_or_none()
+        if record is None:
+            return None
+        return cls.record_to_report(record)
+
+    @classmethod
+    @provide_session
+    def save(cls, report_dict, session=None):
+        """ Creates or replaces a report from its JSON definition """
+        record = (
+            session.query(ReportRecord)
+            .filter(ReportRecord.report_id == report_dict["report_id"])
+            .one_or_none()
+        )
+        if record is None:
+            record = ReportRecord(report_id=report_dict["report_id"])
+            session.add(record)
+
+        definition = {k: v for (k, v) in report_dict.items() if k != "tests"}
+        record.name = cls.report_name(report_dict["report_id"])
+        record.report_title_id = report_dict["report_title_id"]
+        record.definition = json.dumps(definition)
+        record.tests = [
+            ReportTestRecord(
+                position=position,
+                dag_id=test.split(".", 1)[0],
+                task_id=test.split(".", 1)[1],
+            )
+            for (position, test) in enumerate(report_dict["tests"])
+        ]
+        cls.index_report(report_dict)
+
+    @classmethod
+    @provide_session
+    def delete(cls, name, session=None):
+        """ Deletes a report and its test membership """
+        record = (
+            session.query(ReportRecord).filter(ReportRecord.name == name).one_or_none()
+        )
+        if record is not None:
+            session.delete(record)
+            cls.unindex_report(record.report_id)
+
+    @classmethod
+    def record_to_report(cls, record):
+        """ Generates a report object from its table rows """
+        v = json.loads(record.definition)
+        v["tests"] = [test.test for test in record.tests]
+        return cls.to_report(record.name, v)
+
+
+class FileSystemReportRepo(ReportRepo):
+    """
+    FileSystemReportRepo reads report configurations from a folder of
+    JSON or YAML files, one report per file, so reports can be managed
+    alongside DAG code.  A file is only parsed again when its mtime or
+    size changes, which keeps DAG parsing off the metadata database.
+    Reports saved from the web form are written back to the folder.
+    """
+
+    extensions = (".json", ".yaml", ".yml")
+
+    # path -> (mtime, size, Report) of every parsed file
+    _files_lock = threading.Lock()
+    _files = {}
+
+    @classmethod
+    def folder(cls):
+        """ The reports folder, set by reports_folder in [rb_status_plugin] """
+        return os.path.expanduser(
+            conf.get(
+                "rb_status_plugin",
+                "reports_folder",
+                fallback=os.path.join(AIRFLOW_HOME, "rb_status_reports"),
+            )
+        )
+
+    @classmethod
+    def list(cls):
+        """ Return a list of all reports in the reports folder """
+        folder = cls.folder()
+        if not os.path.isdir(folder):
+            return []
+
+        with cls._files_lock:
+            seen = set()
+            with os.scandir(folder) as entries:
+                for entry in sorted(entries, key=lambda e: e.name):
+                    if not entry.is_file() or not entry.name.endswith(cls.extensions):
+                        continue
+
+                    seen.add(entry.path)
+                    stat = entry.stat()
+                    cached = cls._files.get(entry.path)
+                    if cached and cached[:2] == (stat.st_mtime, stat.st_size):
+                        continue
+
+                    report = cls.load_file(entry.path)
+                    cls._files[entry.path] = (stat.st_mtime, stat.st_size, report)
+
+            for path in set(cls._files) - seen:
+                del cls._files[path]
+
+            return [
+                cls._files[path][2]
+                for path in sorted(seen)
+                if cls._files[path][2] is not None
+            ]
+
+    @classmethod
+    def get(cls, name):
+        """ Get a single report by name """
+        return cls.find(lambda report: report.name == name)
+
+    @classmethod
+    def get_report(cls, report_id):
+        """ Get a single report by its report_id """
+        return cls.find(lambda report: report.report_id == report_id)
+
+    @classmethod
+    def get_by_title_id(cls, report_title_id):
+        """ Get a single report by its report_title_id """
+        return cls.find(lambda report: str(report.report_title_id) == report_title_id)
+
+    @classmethod
+    def find(cls, predicate):
+        # Copies keep callers that edit a report from changing the cache
+        for report in cls.list():
+            if predicate(report):
+                return copy.copy(report)
+
+    @classmethod
+    def save(cls, report_dict):
+        """
+        Writes a report's JSON definition to its file, replacing the file
+        that currently holds the report if there is one
+        """
+        folder = cls.folder()
+        os.makedirs(folder, exist_ok=True)
+
+        path = cls.path_of(report_dict["report_id"])
+        if path is None:
+            path = os.path.join(folder, f"{report_dict['report_title_id']}.json")
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            if path.endswith(".json"):
+                json.dump(report_dict, f, indent=2)
+            else:
+                cls.require_yaml(path)
+                yaml.safe_dump(report_dict, f, default_flow_style=False)
+        os.replace(tmp_path, path)
+        cls.index_report(report_dict)
+
+    @classmethod
+    def delete(cls, name):
+        """ Deletes the file of a report """
+        report_id = cls.report_prefix + name
+        path = cls.path_of(report_id)
+        if path is not None:
+            os.remove(path)
+            cls.unindex_report(report_id)
+
+    @classmethod
+    def path_of(cls, report_id):
+        """ Returns the path of the file holding a report, if any """
+        cls.list()
+        with cls._files_lock:
+            for (path, (_, _, report)) in cls._files.items():
+                if report is not None and report.report_id == report_id:
+                    return path
+
+    @classmethod
+    def load_file(cls, path):
+        """
+        Parses a report file.  Invalid files are logged and skipped so a
+        single bad file does not take down every report.
+        """
+        try:
+            with open(path) as f:
+                if path.endswith(".json"):
+                    v = json.load(f)
+                else:
+                    cls.require_yaml(path)
+                    v = yaml.safe_load(f)
+
+            stem = os.path.splitext(os.path.basename(path))[0]
+            v.setdefault("report_id", cls.report_prefix + stem)
+            return cls.to_report(cls.report_name(v["report_id"]), v)
+        except Exception as e:
+            logging.exception(e)
+            logging.error(f"Failed to load report file {path}: {e}")
+            return None
+
+    @staticmethod
+    def require_yaml(path):
+        if yaml is None:
+            raise ImportError(f"PyYAML is required to read and write {path}")
+
+
+REPORT_REPOS = {
+    "variables": VariablesReportRepo,
+    "database": DatabaseReportRepo,
+    "filesystem": FileSystemReportRepo,
+}
+
+
+def get_report_repo():
+    """
+    Returns the ReportRepo selected by the report_repo option in the
+    [rb_status_plugin] section of airflow.cfg (default: variables)
+    """
+    name = conf.get("rb_status_plugin", "report_repo", fallback="variables")
+    try:
+        return REPORT_REPOS[name.lower()]
+    except KeyError:
+        raise AirflowConfigException(
+            f"Unknown rb_status_plugin report_repo {name}, "
+            f"expected one of {', '.join(REPORT_REPOS)}"
+        )
@@ -0,0 +1,101 @@
+from airflow.configuration import conf
+from flask import make_response, request, session
+from flask_login import current_user
+
+import hashlib
+import json
+import threading
+import time
+
+
+class StatusCache:
+    """
+    Per-process cache of the status page payload and of the pages rendered
+    from it.  The payload is recomputed once it is older than the
+    status_cache_ttl option of [rb_status_plugin] (seconds, default 60).
+    Its content hash is used as ETag so polling clients are answered with
+    304 Not Modified without any database work.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._etag = None
+        self._expires = 0
+        self._pages = {}
+
+    @staticmethod
+    def ttl():
+        return conf.getint("rb_status_plugin", "status_cache_ttl", fallback=60)
+
+    @staticmethod
+    def content_hash(data):
+        payload = json.dumps(data, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get(self, compute):
+        """
+        Returns the cached (payload, etag), computing the payload with
+        compute() if it has expired
+        """
+        with self._lock:
+            if self._data is None or time.monotonic() >= self._expires:
+                data = compute()
+                etag = self.content_hash(data)
+                if etag != self._etag:
+                    self._pages = {}
+                self._data, self._etag = data, etag
+                self._expires = time.monotonic() + self.ttl()
+            return self._data, self._etag
+
+    def refresh(self, compute):
+        """ Recomputes the payload now, whatever its age, and returns it """
+        with self._lock:
+            self._expires = 0
+        data, _ = self.get(compute)
+        return data
+
+    def page(self, key, etag, render):
+        """ Returns the page rendered for key from the payload tagged etag """
+        with self._lock:
+            html = self._pages.get((key, etag))
+        if html is None:
+            html = render()
+            with self._lock:
+                if etag == self._etag:
+                    self._pages[(key, etag)] = html
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._data = None
+            self._etag = None
+            self._pages = {}
+
+
+status_cache = StatusCache()
+
+
+def cached_status_response(page, compute, render):
+    """
+    Responds with a status page rendered by render(data), where data is the
+    cached result of compute().  Rendered pages include the user's menu, so
+    they are cached and tagged per user.  Requests with flashed messages
+    waiting to be shown are always rendered fresh.
+    """
+    data, data_etag = status_cache.get(compute)
+    user = current_user.get_id() if current_user.is_authenticated else "anonymous"
+    etag = StatusCache.content_hash([page, user, data_etag])
+
+    if session.get("_flashes"):
+        return make_response(render(data))
+
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    else:
+        response = make_response(
+            status_cache.page((page, user), data_etag, lambda: render(data))
+        )
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,160 @@
+from airflow.configuration import conf
+from airflow.models import DagRun
+from airflow.utils.db import provide_session
+from airflow.utils.state import State
+from sqlalchemy import func
+
+import collections
+import threading
+import time
+import uuid
+
+from rb_status_plugin.core.status_cache import status_cache
+
+
+class StatusFeed:
+    """
+    A change feed of report statuses shared by every client streaming from
+    this process.  Whichever client asks first probes a cheap watermark over
+    finished rb_status_* DagRuns, at most every status_stream_poll_interval
+    seconds.  Statuses are only recomputed when the watermark moves, and the
+    changes are kept as numbered events in a short backlog that every
+    client reads from.
+
+    Event numbers only mean something to the process that made them, so
+    event ids carry the feed's epoch, a token unique to each feed.
+    """
+
+    def __init__(self, backlog=500):
+        self.epoch = uuid.uuid4().hex[:12]
+        self._cond = threading.Condition()
+        self._events = collections.deque(maxlen=backlog)
+        self._sequence = 0
+        self._watermark = None
+        self._last_poll = 0
+        self._summary = None
+        self._reports = None
+
+    @staticmethod
+    def enabled():
+        """
+        Whether the status page streams changes.  Each open stream holds a
+        webserver worker, so streaming is off unless status_stream is set.
+        """
+        return conf.getboolean("rb_status_plugin", "status_stream", fallback=False)
+
+    @staticmethod
+    def poll_interval():
+        return conf.getint(
+            "rb_status_plugin", "status_stream_poll_interval", fallback=10
+        )
+
+    @staticmethod
+    @provide_session
+    def watermark(session=None):
+        """ Returns a stamp that moves whenever a report DagRun finishes """
+        DR = DagRun
+        return tuple(
+            session.query(func.count(DR.id), func.max(DR.id), func.max(DR.end_date))
+            .filter(
+                DR.dag_id.like("rb\\_status\\_%", escape="\\"),
+                DR.state.in_(State.finished()),
+            )
+            .one()
+        )
+
+    def sequence(self):
+        """ The number of the latest event """
+        with self._cond:
+            return self._sequence
+
+    def event_id(self, sequence):
+        """ The id sent with the event numbered sequence """
+        return f"{self.epoch}:{sequence}"
+
+    def resume(self, last_event_id):
+        """
+        Returns the sequence a client resumes from, given the id of the last
+        event it received, or None when that id was sent by another feed
+        (e.g. another webserver worker) and the client must reload
+        """
+        if not last_event_id:
+            return self.sequence()
+        (epoch, _, sequence) = last_event_id.partition(":")
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        sequence = int(sequence)
+        return sequence if sequence <= self.sequence() else None
+
+    def events_after(self, sequence):
+        """
+        Returns the events numbered after sequence, or a single reload event
+        when some of them have already left the backlog
+        """
+        with self._cond:
+            if sequence < self._sequence - len(self._events):
+                return [(self._sequence, "reload", {})]
+            return [event for event in self._events if event[0] > sequence]
+
+    def wait(self, sequence, compute, timeout):
+        """
+        Waits up to timeout seconds for events after sequence, polling for
+        changes meanwhile.  compute() returns the status page data.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            self.poll(compute)
+            events = self.events_after(sequence)
+            remaining = deadline - time.monotonic()
+            if events or remaining <= 0:
+                return events
+
+            with self._cond:
+                self._cond.wait(min(remaining, self.poll_interval()))
+
+    def poll(self, compute):
+        with self._cond:
+            if time.monotonic() - self._last_poll < self.poll_interval():
+                return
+            self._last_poll = time.monotonic()
+
+            watermark = self.watermark()
+            if watermark == self._watermark:
+                return
+            self._watermark = watermark
+
+            data = status_cache.refresh(compute)
+            self.update(data)
+            self._cond.notify_all()
+
+    def update(self, data):
+        """ Compares fresh status page data with the last seen and adds events """
+        summary = data["summary"]
+        reports = {
+            r["report_title_id"]: {
+                "report_title_id": r["report_title_id"],
+                "passed": r["passed"],
+                "updated": r["updated"],
+            }
+            for r in data["reports"]
+        }
+
+        if self._reports is not None:
+            if set(reports) != set(self._reports):
+                self.add_event("reload", {})
+            else:
+                for (report_title_id, report) in reports.items():
+                    if report != self._reports[report_title_id]:
+                        self.add_event("report", report)
+            if summary != self._summary:
+                self.add_event("summary", summary)
+
+        self._summary = summary
+        self._reports = reports
+
+    def add_event(self, event, data):
+        self._sequence += 1
+        self._events.append((self._sequence, event, data))
+
+
+status_feed = StatusFeed()
@@ -0,0 +1,192 @@
+from airflow.configuration import conf
+from airflow.models import DagRun
+from airflow.utils.db import create_session, provide_session
+from airflow.utils.state import State
+from sqlalchemy import func
+
+from rb_status_plugin.core.models import StatusSnapshot
+from rb_status_plugin.core.report_instance import ReportInstance
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import threading
+
+
+class StatusTracker:
+    """
+    Keeps the latest instance of every report between status page
+    computations.  A high-water mark over the end_date of finished
+    rb_status_* DagRuns tells which reports ran since the last update, and
+    only those are evaluated again.  End dates are set by the host finishing
+    a run and committed later, so each update scans again from a grace
+    period before the mark, and a report counts as changed when its runs in
+    that window differ from the previous scan.  The summary (whether any
+    report fails and when the latest one ran) is kept up to date as
+    instances are merged.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._mark = None
+        self._seen = {}
+        self._instances = {}
+        self._failed = set()
+        self._updated = None
+
+    @staticmethod
+    def grace():
+        return timedelta(
+            seconds=conf.getint("rb_status_plugin", "status_mark_grace", fallback=600)
+        )
+
+    @classmethod
+    @provide_session
+    def finished_since(cls, mark, session=None):
+        """
+        Returns the latest end_date and the number of the report DagRuns
+        finished after mark minus the grace period, by dag_id, with the
+        latest end_date among them as the new mark
+        """
+        DR = DagRun
+        query = session.query(DR.dag_id, func.max(DR.end_date), func.count()).filter(
+            DR.dag_id.like("rb\\_status\\_%", escape="\\"),
+            DR.state.in_(State.finished()),
+        )
+        if mark is not None:
+            query = query.filter(DR.end_date > mark - cls.grace())
+
+        seen = {
+            dag_id: (end, count)
+            for (dag_id, end, count) in query.group_by(DR.dag_id).all()
+        }
+        ends = [end for (end, _) in seen.values() if end is not None]
+        if mark is not None:
+            ends.append(mark)
+        return seen, max(ends, default=None)
+
+    def update(self, reports):
+        """
+        Brings the instances of reports up to date.  Returns a dict of
+        dag_id to instance, for reports that have one, the summary as
+        (passed, updated) and a dict of dag_id to the error raised while
+        evaluating a report.
+        """
+        failures = {}
+        with self._lock:
+            # The mark only moves once the changed reports are merged, so
+            # they are looked at again if anything below raises
+            (seen, mark) = self.finished_since(self._mark)
+            # A run committed late, with an end_date below the mark, still
+            # changes its report's count within the grace period
+            changed = {
+                dag_id
+                for (dag_id, runs) in seen.items()
+                if self._seen.get(dag_id) != runs
+            }
+
+            dag_ids = {report.dag_id for report in reports}
+            for dag_id in set(self._instances) - dag_ids:
+                self.remove(dag_id)
+
+            stale = [
+                report
+                for report in reports
+                if report.dag_id in changed or report.dag_id not in self._instances
+            ]
+            if stale:
+                # Snapshots are written at the end of each run, only reports
+                # without one are evaluated from their DagRuns
+                latest = StatusSnapshot.get_many([report.dag_id for report in stale])
+                missing = [report for report in stale if report.dag_id not in latest]
+                if missing:
+                    instances, failures = self.evaluate(missing)
+                    latest.update(instances)
+                for (dag_id, instance) in latest.items():
+                    try:
+                        self.merge(dag_id, instance)
+                    except Exception as e:
+                        failures[dag_id] = e
+                for dag_id in failures:
+                    self.remove(dag_id)
+
+            (self._mark, self._seen) = (mark, seen)
+            return dict(self._instances), (not self._failed, self._updated), failures
+
+    @staticmethod
+    def workers():
+        return conf.getint("rb_status_plugin", "status_workers", fallback=0)
+
+    def evaluate(self, reports):
+        """
+        Gets the latest instance of each report, with its errors loaded.
+        With the status_workers option of [rb_status_plugin] above 1, the
+        reports are evaluated one by one on that many threads, each with its
+        own session.  Otherwise they are loaded together in one go.
+
+        :return: dicts of dag_id to instance and of dag_id to the error
+            raised while evaluating the report
+        :rtype: tuple
+        """
+        workers = min(self.workers(), len(reports))
+        if workers <= 1:
+            return ReportInstance.get_latest_many(reports), {}
+
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="rb_status"
+        ) as pool:
+            results = list(pool.map(self.evaluate_one, reports))
+
+        instances, failures = {}, {}
+        for (report, (instance, error)) in zip(reports, results):
+            if error is None:
+                instances[report.dag_id] = instance
+            else:
+                failures[report.dag_id] = error
+        return instances, failures
+
+    @staticmethod
+    def evaluate_one(report):
+        try:
+            with create_session() as session:
+                instance = ReportInstance.get_latest(report, session=session)
+                instance.errors()
+            return instance, None
+        except Exception as e:
+            return None, e
+
+    def forget(self, dag_id):
+        """ Drops the instance of a deleted report """
+        with self._lock:
+            self.remove(dag_id)
+
+    def merge(self, dag_id, instance):
+        previous = self._instances.get(dag_id)
+        if instance.errors():
+            self._failed.add(dag_id)
+        else:
+            self._failed.discard(dag_id)
+        self._instances[dag_id] = instance
+
+        moved_back = previous is not None and instance.updated < previous.updated
+        if moved_back and previous.updated == self._updated:
+            self.reduce_updated()
+        elif self._updated is None or instance.updated > self._updated:
+            self._updated = instance.updated
+
+    def remove(self, dag_id):
+        instance = self._instances.pop(dag_id, None)
+        self._failed.discard(dag_id)
+        if instance is not None and instance.updated == self._updated:
+            self.reduce_updated()
+
+    def reduce_updated(self):
+        # Only needed when the latest instance goes away or moves back in time
+        self._updated = max(
+            (instance.updated for instance in self._instances.values()), default=None
+        )
+
+
+status_tracker = StatusTracker()
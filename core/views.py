@@ -1,5 +1,13 @@
 from flask_appbuilder import BaseView as AppBuilderBaseView, expose
-from flask import flash, redirect, url_for, request
+from flask import (
+    Response,
+    flash,
+    jsonify,
+    redirect,
+    request,
+    stream_with_context,
+    url_for,
+)
 from flask_appbuilder import SimpleFormView
 from flask_appbuilder.forms import DynamicForm
 from flask_appbuilder.fieldwidgets import (
@@ -10,22 +18,31 @@ from flask_appbuilder.fieldwidgets import (
 )
 from flask_appbuilder.security.decorators import has_access
 from wtforms import (
+    BooleanField,
+    IntegerField,
     StringField,
     TextAreaField,
     SelectMultipleField,
     SelectField,
     HiddenField,
 )
-from wtforms.validators import DataRequired, Email
+from wtforms.validators import DataRequired, Email, NumberRange, Optional
 from wtforms_components import TimeField
 
 from rb_status_plugin.core.report import Report
-from rb_status_plugin.core.report_repo import VariablesReportRepo
-from rb_status_plugin.core.report_instance import ReportInstance
+from rb_status_plugin.core.report_repo import get_report_repo
+from rb_status_plugin.core.status_cache import cached_status_response, status_cache
+from rb_status_plugin.core.status_feed import status_feed
+from rb_status_plugin.core.status_tracker import status_tracker
 from rb_status_plugin.core.report_form_saver import ReportFormSaver
 from rb_status_plugin.core.helpers.list_tasks_helper import get_all_test_choices
+from rb_status_plugin.core.helpers.list_pools_helper import get_pool_choices
 from airflow.configuration import conf
+import base64
+import bisect
+import json
 import logging
+import time
 
 
 form_fieldsets_config = [
@@ -52,9 +69,58 @@ form_fieldsets_config = [
             ]
         },
     ),
-    ("Tests", {"fields": ["tests"]}),
+    ("Tests", {"fields": ["tests", "batch_tests"]}),
+    (
+        "Execution",
+        {
+            "fields": [
+                "pool",
+                "sensor_mode",
+                "poke_interval",
+                "timeout",
+                "priority_weight",
+            ]
+        },
+    ),
 ]
 
+sensor_mode_choices = [
+    ("", "Default"),
+    ("reschedule", "Reschedule"),
+    ("poke", "Poke"),
+]
+
+
+# Fields of a report in the status API, errors are only sent when asked for
+report_fields = [
+    "id",
+    "passed",
+    "updated",
+    "report_title",
+    "report_title_id",
+    "owner_name",
+    "owner_email",
+    "description",
+    "subscribers",
+    "errors",
+]
+default_report_fields = [field for field in report_fields if field != "errors"]
+report_statuses = {"passed": True, "failed": False, "unknown": None}
+max_page_size = 500
+
+
+def report_sort_key(report):
+    return (report["report_title"], report["report_title_id"])
+
+
+def encode_cursor(report):
+    key = json.dumps(report_sort_key(report))
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii"))))
+
 
 # Creating a flask appbuilder BaseView
 class StatusView(AppBuilderBaseView):
@@ -74,18 +140,20 @@ class StatusView(AppBuilderBaseView):
         and pass it all down to the template
         """
         reports = []
-        passed = True
-        updated = None
         logging.info("Loading reports")
-        for report in VariablesReportRepo.list():
+        report_list = get_report_repo().list()
+        # Only reports whose DagRuns finished since the last call are
+        # evaluated again, the summary is kept up to date by the tracker
+        latest, (passed, updated), failures = status_tracker.update(report_list)
+        for report in report_list:
             try:
-                ri = ReportInstance.get_latest(report)
-
-                if not updated:
-                    updated = ri.updated
-
-                if updated < ri.updated:
-                    updated = ri.updated
+                if report.dag_id in failures:
+                    raise failures[report.dag_id]
+                ri = latest.get(report.dag_id)
+                if ri is None:
+                    raise LookupError(
+                        f"Could not find finished DagRun for {report.dag_id}"
+                    )
 
                 r = {
                     "id": ri.id,
@@ -100,8 +168,6 @@ class StatusView(AppBuilderBaseView):
                 }
 
                 r["errors"] = ri.errors()
-                if len(r["errors"]) > 0:
-                    passed = False
                 reports.append(r)
             except Exception as e:
                 logging.exception(e)
@@ -116,9 +182,136 @@ class StatusView(AppBuilderBaseView):
         }
         return data
 
+    def status_data(self):
+        """ Returns the cached reports data """
+        data, _ = status_cache.get(self.reports_data)
+        return data
+
     @expose("/")
     def list(self):
-        return self.render_template("status.html", content=self.reports_data())
+        # Server-rendered until static/status.js is rebuilt from its source,
+        # which pages reports in through the API instead
+        return cached_status_response(
+            "status",
+            self.reports_data,
+            lambda data: self.render_template("status.html", content=data),
+        )
+
+    def summary_data(self, data):
+        reports = data["reports"]
+        return {
+            "summary": data["summary"],
+            "total": len(reports),
+            "failed": len([r for r in reports if r["passed"] is False]),
+            "rbac": data["rbac"],
+        }
+
+    @expose("/api/summary")
+    def api_summary(self):
+        """ Returns the overall status and the number of reports """
+        return jsonify(self.summary_data(self.status_data()))
+
+    @expose("/api/reports")
+    def api_reports(self):
+        """
+        Returns a page of reports sorted by title.
+
+        Query arguments:
+        page or cursor: page number (from 1) or the next cursor of the previous page
+        page_size: number of reports per page (default 50)
+        fields: comma separated report fields (default all but errors)
+        status: only return passed, failed or unknown reports
+        """
+        reports = sorted(self.status_data()["reports"], key=report_sort_key)
+
+        status = request.args.get("status")
+        if status:
+            if status not in report_statuses:
+                return jsonify(error=f"Unknown status {status}"), 400
+            reports = [r for r in reports if r["passed"] is report_statuses[status]]
+
+        fields = request.args.get("fields")
+        fields = fields.split(",") if fields else default_report_fields
+        unknown_fields = set(fields) - set(report_fields)
+        if unknown_fields:
+            return jsonify(error=f"Unknown fields {', '.join(unknown_fields)}"), 400
+
+        page_size = request.args.get("page_size", 50, type=int)
+        page_size = min(max(page_size, 1), max_page_size)
+        cursor = request.args.get("cursor")
+        if cursor:
+            try:
+                key = decode_cursor(cursor)
+            except ValueError:
+                return jsonify(error="Invalid cursor"), 400
+            start = bisect.bisect_right([report_sort_key(r) for r in reports], key)
+        else:
+            start = (max(request.args.get("page", 1, type=int), 1) - 1) * page_size
+
+        page = reports[start : start + page_size]
+        next_url = None
+        if start + page_size < len(reports):
+            next_url = url_for(
+                "StatusView.api_reports",
+                cursor=encode_cursor(page[-1]),
+                page_size=page_size,
+                fields=",".join(fields),
+                status=status,
+            )
+
+        return jsonify(
+            reports=[{field: r[field] for field in fields} for r in page],
+            total=len(reports),
+            next=next_url,
+        )
+
+    @expose("/api/reports/<string:report_title_id>/errors")
+    def api_report_errors(self, report_title_id):
+        """ Returns the failed and unknown tests of a report """
+        for report in self.status_data()["reports"]:
+            if str(report["report_title_id"]) == report_title_id:
+                return jsonify(errors=report["errors"])
+        return jsonify(error=f"Report {report_title_id} not found"), 404
+
+    @expose("/stream")
+    def stream(self):
+        """
+        Streams report status changes as Server-Sent Events.
+
+        Events are "report" (report_title_id, passed and updated of a changed
+        report), "summary" and "reload" (the set of reports changed).  The
+        stream ends after status_stream_timeout seconds, browsers reconnect
+        on their own and resume from the Last-Event-ID header.  A client
+        whose last event came from another process is sent "reload".  It is
+        only served when the status_stream option is on.
+        """
+        if not status_feed.enabled():
+            return jsonify(error="Status streaming is turned off"), 404
+
+        sequence = status_feed.resume(request.headers.get("Last-Event-ID"))
+        timeout = conf.getint("rb_status_plugin", "status_stream_timeout", fallback=300)
+
+        def events(sequence):
+            deadline = time.monotonic() + timeout
+            yield "retry: 5000\n\n"
+            if sequence is None:
+                event_id = status_feed.event_id(status_feed.sequence())
+                yield f"id: {event_id}\nevent: reload\ndata: {{}}\n\n"
+                return
+            while time.monotonic() < deadline:
+                changes = status_feed.wait(sequence, self.reports_data, timeout=15)
+                for (sequence, event, data) in changes:
+                    event_id = status_feed.event_id(sequence)
+                    yield f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+                if not changes:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+
+        return Response(
+            stream_with_context(events(sequence)),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
 
 class ReportsView(AppBuilderBaseView):
@@ -126,7 +319,7 @@ class ReportsView(AppBuilderBaseView):
 
     @expose("/")
     def list(self):
-        return self.render_template("reports.html", content=VariablesReportRepo.list())
+        return self.render_template("reports.html", content=get_report_repo().list())
 
     @expose("/<string:report_name>/trigger/", methods=["GET"])
     def trigger(self, report_name):
@@ -137,9 +330,11 @@ class ReportsView(AppBuilderBaseView):
 
     @expose("/<string:report_name>/delete/", methods=["POST"])
     def delete(self, report_name):
-        r = Report(report_name)
-        r.delete_report_variable(VariablesReportRepo.report_prefix)
-        r.delete_dag()
+        get_report_repo().delete(report_name)
+        report = Report(report_name)
+        report.delete_dag()
+        status_tracker.forget(report.dag_id)
+        status_cache.clear()
         flash(f"Deleted report: {report_name}", "info")
         return redirect(url_for("ReportsView.list"))
 
@@ -194,6 +389,13 @@ class ReportForm(DynamicForm):
         widget=Select2ManyWidget(),
         validators=[DataRequired()],
     )
+    batch_tests = BooleanField(
+        ("Check tests in one task"),
+        description=(
+            "Check all tests with a single sensor task instead of one task per\
+         test. Recommended for reports with many tests."
+        ),
+    )
     schedule_type = SelectField(
         ("Schedule"),
         description=("Select how you want to schedule the report"),
@@ -239,6 +441,44 @@ class ReportForm(DynamicForm):
         widget=BS3TextFieldWidget(),
         validators=[DataRequired()],
     )
+    pool = SelectField(
+        ("Pool"),
+        description=(
+            "Pool whose slots the report's tasks take. Use a pool to cap the\
+         slots the report uses at once."
+        ),
+        choices=None,
+        widget=Select2Widget(),
+        validators=[Optional()],
+    )
+    sensor_mode = SelectField(
+        ("Sensor mode"),
+        description=(
+            "Reschedule frees the worker slot between pokes, poke keeps it.\
+         Leave empty to use the sensor_mode option."
+        ),
+        choices=sensor_mode_choices,
+        widget=Select2Widget(),
+        validators=[Optional()],
+    )
+    poke_interval = IntegerField(
+        ("Poke interval"),
+        description="Seconds between the first pokes of a test's sensor",
+        widget=BS3TextFieldWidget(),
+        validators=[Optional(), NumberRange(min=1)],
+    )
+    timeout = IntegerField(
+        ("Timeout"),
+        description="Seconds a sensor waits for its test before failing",
+        widget=BS3TextFieldWidget(),
+        validators=[Optional(), NumberRange(min=1)],
+    )
+    priority_weight = IntegerField(
+        ("Priority weight"),
+        description="Tasks of reports with a higher weight are queued first",
+        widget=BS3TextFieldWidget(),
+        validators=[Optional()],
+    )
 
 
 class NewReportFormView(SimpleFormView):
@@ -250,9 +490,10 @@ class NewReportFormView(SimpleFormView):
     message = "Report submitted"
 
     # We're going to override form_get to preprocess
-    # the form and refresh all its test choices
+    # the form and refresh all its test and pool choices
     def form_get(self, form):
         form.tests.choices = get_all_test_choices()
+        form.pool.choices = get_pool_choices()
         return form
 
     @expose("/", methods=["GET"])
@@ -293,6 +534,7 @@ class EditReportFormView(SimpleFormView):
         form = self.form.refresh()
         form = self.form_get(form, report_title)
         form.tests.choices = get_all_test_choices()
+        form.pool.choices = get_pool_choices()
         if form:
             widgets = self._get_edit_widget(form=form)
             self.update_redirect()
@@ -307,10 +549,7 @@ class EditReportFormView(SimpleFormView):
 
     def form_get(self, form, report_title):
         # !get report by report_title and prefill form with its values
-        requested_report = {}
-        for report in VariablesReportRepo.list():
-            if str(report.report_title_id) == report_title:
-                requested_report = report
+        requested_report = get_report_repo().get_by_title_id(report_title)
 
         if requested_report:
             form = ReportFormSaver.load_form(form, requested_report)
@@ -4,8 +4,10 @@ from flask_admin.form import rules
 from flask import flash, redirect, url_for, request
 
 from rb_status_plugin.core.report_model import ReportModel
-from rb_status_plugin.core.report_repo import VariablesReportRepo
+from rb_status_plugin.core.report_repo import get_report_repo
 from rb_status_plugin.core.report import Report
+from rb_status_plugin.core.status_cache import cached_status_response, status_cache
+from rb_status_plugin.core.status_tracker import status_tracker
 from rb_status_plugin.core.views import (
     StatusView,
     ReportsView,
@@ -18,15 +20,17 @@ reports_view_rbac = ReportsView()
 class StatusViewAdmin(BaseView):
     @expose("/")
     def test(self):
-        return self.render(
-            "no_rbac/status.html", content=status_view_rbac.reports_data()
+        return cached_status_response(
+            "no_rbac/status",
+            status_view_rbac.reports_data,
+            lambda data: self.render("no_rbac/status.html", content=data),
         )
 
 
 class ReportsViewAdmin(BaseView):
     @expose("/")
     def list(self):
-        return self.render("no_rbac/reports.html", content=VariablesReportRepo.list())
+        return self.render("no_rbac/reports.html", content=get_report_repo().list())
 
     @expose("/<string:report_name>/trigger/", methods=["GET"])
     def trigger(self, report_name):
@@ -37,9 +41,11 @@ class ReportsViewAdmin(BaseView):
 
     @expose("/<string:report_name>/delete/", methods=["POST"])
     def delete(self, report_name):
-        r = Report(report_name)
-        r.delete_report_variable(VariablesReportRepo.report_prefix)
-        r.delete_dag()
+        get_report_repo().delete(report_name)
+        report = Report(report_name)
+        report.delete_dag()
+        status_tracker.forget(report.dag_id)
+        status_cache.clear()
         flash(f"Deleted report: {report_name}", "info")
         return redirect(url_for("rb/reports.list"))
 
@@ -69,7 +75,11 @@ class ReportMgmtViewAdmin(ReportModel):
             ("schedule_type", "schedule_time", "schedule_week_day", "schedule_custom"),
             "Schedule",
         ),
-        rules.FieldSet(("tests",), "Tests"),
+        rules.FieldSet(("tests", "batch_tests"), "Tests"),
+        rules.FieldSet(
+            ("pool", "sensor_mode", "poke_interval", "timeout", "priority_weight"),
+            "Execution",
+        ),
     ]
 
     # We're doing this to hide the view from the main
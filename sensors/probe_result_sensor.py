@@ -0,0 +1,99 @@
+from airflow.sensors.base_sensor_operator import BaseSensorOperator
+from airflow.utils import timezone
+from airflow.utils.dates import cron_presets
+from airflow.utils.decorators import apply_defaults
+from croniter import croniter
+from rb_status_plugin.core.models import ResultRecord
+from rb_status_plugin.sensors.status_sensor import BackoffSensorMixin
+
+from datetime import datetime, timedelta
+
+
+class ProbeResultSensor(BackoffSensorMixin, BaseSensorOperator):
+    """
+    This operator will collect the results that the shared probe
+    DAG recorded for each of a report's tests, and will record them
+    as the results of the report's run.  It succeeds once every test
+    has a result observed since the report's schedule tick.
+
+    :param tests: Tests to collect, as "dag_id.task_id"
+    :type tests: list
+    :param probe_dag_id: DAG whose runs record the tests' results
+    :type probe_dag_id: str
+    :param probe_schedule: Cron schedule of the probe DAG, which bounds
+        the probe runs searched for results
+    :type probe_schedule: str
+    :param probe_timeout: Timeout of the probe's sensors, in seconds
+    :type probe_timeout: int
+    :param max_poke_interval: Longest wait between two pokes, in seconds
+    :type max_poke_interval: int
+    """
+
+    template_fields = ("tests",)
+
+    @apply_defaults
+    def __init__(
+        self,
+        tests,
+        probe_dag_id,
+        *args,
+        probe_schedule=None,
+        probe_timeout=0,
+        max_poke_interval=None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.tests = tests
+        self.probe_dag_id = probe_dag_id
+        self.probe_schedule = probe_schedule
+        self.probe_timeout = probe_timeout
+        self.saved_results = {}
+        self.init_backoff(max_poke_interval)
+
+    @staticmethod
+    def tick(context):
+        """ When the report's run was due: its trigger time if triggered """
+        if context["dag_run"].external_trigger:
+            return context["execution_date"]
+        return context["next_execution_date"]
+
+    def runs_since(self, tick):
+        """
+        Execution date of the oldest probe run that can still observe a
+        result after tick: the run due before its sensors would time out,
+        with one more schedule interval of slack.  None without a schedule.
+        """
+        if self.probe_schedule is None:
+            return None
+        schedule = cron_presets.get(self.probe_schedule, self.probe_schedule)
+        start = tick - timedelta(seconds=self.probe_timeout)
+        ticks = croniter(schedule, timezone.make_naive(start, timezone.utc))
+        ticks.get_prev(datetime)
+        return timezone.make_aware(ticks.get_prev(datetime), timezone.utc)
+
+    def poke(self, context):
+        self.log.info(
+            f"Collecting the results of {len(self.tests)} tests "
+            f"from {self.probe_dag_id}..."
+        )
+        tick = self.tick(context)
+        results = ResultRecord.latest_of_dag(
+            self.probe_dag_id,
+            self.tests,
+            since=tick,
+            runs_since=self.runs_since(tick),
+        )
+        changed = {
+            test: result
+            for (test, result) in results.items()
+            if self.saved_results.get(test) != result
+        }
+        if changed:
+            ResultRecord.save_many(context["dag_run"].id, changed)
+            self.saved_results.update(changed)
+
+        pending = [test for test in self.tests if test not in results]
+        self.log.info(f"{len(pending)} of {len(self.tests)} tests not probed yet")
+        if pending:
+            self.back_off(context)
+        return not pending
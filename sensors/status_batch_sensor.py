@@ -0,0 +1,109 @@
+from airflow.sensors.base_sensor_operator import BaseSensorOperator
+from airflow.utils.decorators import apply_defaults
+from airflow.utils.db import provide_session
+from rb_status_plugin.core.helpers.task_state_helper import current_task_states
+from rb_status_plugin.core.models import ResultRecord
+from rb_status_plugin.sensors.status_sensor import (
+    TERMINAL_FAILURE_STATES,
+    TERMINAL_SUCCESS_STATES,
+    BackoffSensorMixin,
+    lookback_since,
+)
+
+
+class StatusBatchSensor(BackoffSensorMixin, BaseSensorOperator):
+    """
+    This operator will check whether each of a report's
+    tests (task_instances) succeeded or failed, with a single
+    query per poke, and will record their results together.
+    It succeeds once all tests have finished.
+
+    :param tests: Tests to check, as "dag_id.task_id"
+    :type tests: list
+    :param max_poke_interval: Longest wait between two pokes, in seconds
+    :type max_poke_interval: int
+    :param lookback: Only consider test runs executed this long before the
+        report's run or later
+    :type lookback: datetime.timedelta
+    """
+
+    template_fields = ("tests",)
+
+    @apply_defaults
+    def __init__(self, tests, *args, max_poke_interval=None, lookback=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tests = tests
+        self.lookback = lookback
+        self.saved_results = {}
+        self.init_backoff(max_poke_interval)
+
+    def save_results(self, context, results):
+        """ Saves the changed results, a dict of test to (status, log_url) """
+        changed = {
+            test: result
+            for (test, result) in results.items()
+            if self.saved_results.get(test) != result
+        }
+        if changed:
+            ResultRecord.save_many(context["dag_run"].id, changed)
+            self.saved_results.update(changed)
+
+    @provide_session
+    def latest_task_instances(self, context, session=None):
+        """
+        Returns a dict of test to the TaskState of the latest task instance
+        of each test, and the tests whose DAG has not created a DagRun in
+        the lookback window yet
+        """
+        since = lookback_since(context, self.lookback)
+        dag_ids = {test.split(".", 1)[0] for test in self.tests}
+        waiting_dags = self.dags_awaiting_run(dag_ids, since, session)
+        waiting = {t for t in self.tests if t.split(".", 1)[0] in waiting_dags}
+        states = current_task_states(
+            [test for test in self.tests if test not in waiting],
+            since=since,
+            session=session,
+        )
+        return states, waiting
+
+    def poke(self, context):
+        self.log.info(f"Querying for the results of {len(self.tests)} tests...")
+        # Unknown results link to the sensor's own logs
+        unknown = (None, context["ti"].log_url)
+        try:
+            (tis, waiting) = self.latest_task_instances(context)
+        except Exception as e:
+            # Tests that already passed or failed keep their result
+            try:
+                known = ResultRecord.tests_of(context["dag_run"].id, known=True)
+                self.save_results(
+                    context, {test: unknown for test in self.tests if test not in known}
+                )
+            except Exception:
+                self.log.exception("Could not record the unknown results")
+            raise e
+
+        results = {}
+        pending = []
+        for test in self.tests:
+            ti = tis.get(test)
+            results[test] = unknown
+            if test in waiting:
+                pending.append(test)
+            elif ti is None:
+                # Like StatusSensor, a test that never ran is unknown
+                self.log.info(f"{test} has no task instance")
+            elif ti.state in TERMINAL_SUCCESS_STATES:
+                results[test] = (True, None)
+            elif ti.state in TERMINAL_FAILURE_STATES:
+                results[test] = (False, ti.log_url)
+            else:
+                pending.append(test)
+
+        # Results are saved as they come, so a timeout leaves the tests
+        # still running as unknown
+        self.save_results(context, results)
+        self.log.info(f"{len(pending)} of {len(self.tests)} tests still running")
+        if pending:
+            self.back_off(context)
+        return not pending
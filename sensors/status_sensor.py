@@ -1,11 +1,81 @@
 from airflow.sensors.base_sensor_operator import BaseSensorOperator
 from airflow.utils.decorators import apply_defaults
-from airflow.models.taskinstance import TaskInstance
-from airflow.utils.state import State
+from airflow.models import DagRun, TaskReschedule
 from airflow.utils.db import provide_session
+from sqlalchemy import func
+from rb_status_plugin.core.helpers.task_state_helper import (
+    TERMINAL_FAILURE_STATES,
+    TERMINAL_SUCCESS_STATES,
+    current_task_states,
+)
+from rb_status_plugin.core.models import ResultRecord
 
+import random
 
-class StatusSensor(BaseSensorOperator):
+
+class BackoffSensorMixin:
+    """
+    Spaces out the pokes of a sensor that keeps waiting.  Each poke that
+    returns False doubles the wait before the next one, up to
+    max_poke_interval seconds, with jitter so the sensors of a report do
+    not poke in lockstep.  In reschedule mode the operator is loaded afresh
+    for every poke, so earlier pokes are counted from the reschedules of
+    the task instance.
+    """
+
+    def init_backoff(self, max_poke_interval=None):
+        self.base_poke_interval = self.poke_interval
+        self.max_poke_interval = max(
+            max_poke_interval or self.poke_interval, self.poke_interval
+        )
+        self.pokes = 0
+
+    def back_off(self, context):
+        if self.reschedule:
+            pokes = len(TaskReschedule.find_for_task_instance(context["ti"]))
+        else:
+            pokes = self.pokes
+            self.pokes += 1
+
+        interval = min(
+            self.base_poke_interval * 2 ** min(pokes, 16), self.max_poke_interval
+        )
+        self.poke_interval = random.uniform(interval / 2, interval)
+        self.log.info(f"Poking again in {self.poke_interval:.0f} seconds")
+
+    @staticmethod
+    def dags_awaiting_run(dag_ids, since, session):
+        """
+        Returns those of dag_ids that ran before since but have not created
+        a DagRun from since on, so their next task instances can only be
+        waited for.  DAGs that never ran are not waited for, their tests are
+        unknown.  Without since there is no window to wait for, and nothing
+        is queried.
+        """
+        if since is None:
+            return set()
+        return {
+            dag_id
+            for (dag_id, latest) in session.query(
+                DagRun.dag_id, func.max(DagRun.execution_date)
+            )
+            .filter(DagRun.dag_id.in_(set(dag_ids)))
+            .group_by(DagRun.dag_id)
+            if latest < since
+        }
+
+
+def lookback_since(context, lookback):
+    """
+    Earliest execution_date of the test task instances a sensor considers,
+    lookback before the report's run, or None to consider all of them
+    """
+    if not lookback:
+        return None
+    return context["execution_date"] - lookback
+
+
+class StatusSensor(BackoffSensorMixin, BaseSensorOperator):
     """
     This operator will check whether a test
     (task_instance) succeeded or failed, and
@@ -13,23 +83,34 @@ class StatusSensor(BaseSensorOperator):
 
     :param test_name: Name of task_instance to be tested
     :type test_name: str
+    :param max_poke_interval: Longest wait between two pokes, in seconds
+    :type max_poke_interval: int
+    :param lookback: Only consider test runs executed this long before the
+        report's run or later
+    :type lookback: datetime.timedelta
     """
 
     template_fields = ("test_dag_id", "test_task_id")
 
     @apply_defaults
-    def __init__(self, test_dag_id, test_task_id, *args, **kwargs):
+    def __init__(
+        self,
+        test_dag_id,
+        test_task_id,
+        *args,
+        max_poke_interval=None,
+        lookback=None,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         self.test_dag_id = test_dag_id
         self.test_task_id = test_task_id
+        self.lookback = lookback
+        self.init_backoff(max_poke_interval)
 
-    def push_test_status(self, ti, test_status):
-        xcom_key = "rb_status_test_task_status"
-        ti.xcom_push(key=xcom_key, value=test_status)
-
-    def push_task_url(self, ti, log_url):
-        xcom_key = "rb_status_task_log_url"
-        ti.xcom_push(key=xcom_key, value=log_url)
+    def save_result(self, context, test_status, log_url=None):
+        test = f"{self.test_dag_id}.{self.test_task_id}"
+        ResultRecord.save_many(context["dag_run"].id, {test: (test_status, log_url)})
 
     @provide_session
     def poke(self, context, session=None):
@@ -37,39 +118,30 @@ class StatusSensor(BaseSensorOperator):
             f"Querying for {self.test_dag_id}.{self.test_task_id}'s result..."
         )
         try:
-            ti = (
-                session.query(TaskInstance)
-                .filter(
-                    TaskInstance.task_id == self.test_task_id,
-                    TaskInstance.dag_id == self.test_dag_id,
-                )
-                .order_by(TaskInstance.execution_date.desc())
-                .first()
-            )
+            since = lookback_since(context, self.lookback)
+            if self.dags_awaiting_run([self.test_dag_id], since, session):
+                self.log.info(f"{self.test_dag_id} has not created a DagRun yet")
+                self.back_off(context)
+                return False
 
-            terminal_failure_states = [
-                State.FAILED,
-                State.UPSTREAM_FAILED,
-                State.SHUTDOWN,
-                State.REMOVED,
-            ]
-            terminal_success_states = [State.SUCCESS, State.SKIPPED]
+            test = f"{self.test_dag_id}.{self.test_task_id}"
+            ti = current_task_states([test], since=since, session=session).get(test)
 
             state = ti.state
             self.log.info(
                 f"{self.test_dag_id}.{self.test_task_id}'s state is {ti.state}"
             )
-            if state in terminal_success_states:
-                self.push_test_status(ti=context["ti"], test_status=True)
+            if state in TERMINAL_SUCCESS_STATES:
+                self.save_result(context, True)
                 return True
-            if state in terminal_failure_states:
-                self.push_test_status(ti=context["ti"], test_status=False)
-                self.push_task_url(ti=context["ti"], log_url=ti.log_url)
+            if state in TERMINAL_FAILURE_STATES:
+                self.save_result(context, False, ti.log_url)
                 return True
 
+            self.back_off(context)
             return False
 
         except Exception as e:
-            self.push_test_status(ti=context["ti"], test_status=None)
-            self.push_task_url(ti=context["ti"], log_url="unknown")
+            # Unknown results link to the sensor's own logs
+            self.save_result(context, None, context["ti"].log_url)
             raise e
@@ -1,14 +1,19 @@
 /* global rbStatusContent, isoDateToTimeEl */
 
-setReportsTimes(rbStatusContent);
+// Rendered report cards and their reports, by report_title_id
+const reportCards = new Map();
+
+setSummaryTime(rbStatusContent);
+loadReports(rbStatusContent.api.reports).then(() =>
+  watchReports(rbStatusContent.api.stream)
+);
 
 /**
- * Display dates in a airflow defined timezone and format.
+ * Display the summary date in a airflow defined timezone and format.
  *
  * @param {object} content Status page content from the template
  */
-function setReportsTimes(content) {
-  // update summary status updated datetime
+function setSummaryTime(content) {
   const summaryUpdatedEl = document.querySelector(".report-datetime-header");
   if (content.summary.updated) {
     summaryUpdatedEl.innerHTML = "";
@@ -16,12 +21,271 @@ function setReportsTimes(content) {
       isoDateToTimeEl(content.summary.updated, { title: false })
     );
   }
+}
+
+/**
+ * Fetch reports one page at a time and append them to the reports list.
+ *
+ * @param {string} url URL of the first page of reports
+ */
+async function loadReports(url) {
+  const listEl = document.getElementById("reports-list");
+  if (!listEl) {
+    return;
+  }
+
+  let next = url;
+  while (next) {
+    const response = await fetch(next, { credentials: "same-origin" });
+    if (!response.ok) {
+      listEl.append(`Failed to load reports (${response.status})`);
+      break;
+    }
+    const page = await response.json();
+    const fragment = document.createDocumentFragment();
+    for (const report of page.reports) {
+      fragment.append(renderReport(report));
+    }
+    listEl.append(fragment);
+    next = page.next;
+  }
+  listEl.setAttribute("aria-busy", "false");
+}
+
+/**
+ * Escape text for use in HTML.
+ *
+ * @param {*} value text to escape
+ * @return {string} escaped text
+ */
+function escapeHtml(value) {
+  const el = document.createElement("div");
+  el.textContent = value === null || value === undefined ? "" : value;
+  return el.innerHTML;
+}
+
+/**
+ * Build the card of a report. Its errors are loaded once the
+ * details panel is first expanded.
+ *
+ * @param {object} report report from the status API
+ * @return {HTMLElement} report card
+ */
+function renderReport(report) {
+  const statuses = { true: "passed", false: "failed" };
+  const status = statuses[report.passed] || "unknown";
+  const id = escapeHtml(report.report_title_id);
+  const subscribers = (report.subscribers || []).join(", ");
+  const ownerEmail = report.owner_email
+    ? `<a href="mailto:${escapeHtml(report.owner_email)}">${escapeHtml(
+        report.owner_email
+      )}</a>`
+    : "";
+
+  const el = document.createElement("div");
+  el.className = `report-base report ${status}`;
+  el.innerHTML = `
+    <div id="report-${id}-heading" class="report-header" role="tab">
+      <div class="report-highlights">
+        <div class="report-indicator"></div>
+        <div class="report-meta">
+          <span class="report-status">${
+            status.charAt(0).toUpperCase() + status.slice(1)
+          }</span> /
+          Updated
+          <span class="report-datetime"></span>
+          <h3>${escapeHtml(report.report_title)}</h3>
+        </div>
+      </div>
+      <div>
+        <button type="button" class="btn btn-link report-details-trigger collapsed"
+          data-toggle="collapse" data-target="#report-${id}-details"
+          aria-expanded="false" aria-controls="report-${id}-details">
+          Details
+          <i class="fa fa-angle-down" aria-hidden="true"></i>
+        </button>
+      </div>
+    </div>
+    <div id="report-${id}-details" class="collapse" role="tabpanel"
+      aria-labelledby="report-${id}-heading">
+      <div class="report-details">
+        <p>
+          <strong>Report Owner:</strong>
+          ${escapeHtml(report.owner_name)}
+          ${ownerEmail}
+        </p>
+        <p>
+          <strong>Description:</strong>
+          ${escapeHtml(report.description)}
+        </p>
+        <p>
+          <strong>Subscribers:</strong>
+          ${escapeHtml(subscribers)}
+        </p>
+        <div class="report-errors-placeholder"></div>
+      </div>
+    </div>`;
+
+  el.querySelector(".report-datetime").append(
+    isoDateToTimeEl(report.updated, { title: false })
+  );
+  el.querySelector(".report-details-trigger").addEventListener("click", () => {
+    if (el.dataset.errorsLoaded !== "true") {
+      el.dataset.errorsLoaded = "true";
+      loadErrors(report, el.querySelector(".report-errors-placeholder"));
+    }
+  });
+  reportCards.set(String(report.report_title_id), { report, el });
+  return el;
+}
+
+/**
+ * Fetch the errors of a report and render them in its details panel.
+ *
+ * @param {object} report report from the status API
+ * @param {HTMLElement} placeholderEl element to render the errors into
+ */
+async function loadErrors(report, placeholderEl) {
+  if (report.passed === true) {
+    return;
+  }
 
-  // update reports updated datetime
-  for (const report of content.reports) {
-    const updatedElSelector = `#report-${report.report_title_id}-heading .report-datetime`;
-    const updatedEl = document.querySelector(updatedElSelector);
-    updatedEl.innerHTML = "";
-    updatedEl.append(isoDateToTimeEl(report.updated, { title: false }));
+  const url = rbStatusContent.api.errors.replace(
+    "__report_title_id__",
+    encodeURIComponent(report.report_title_id)
+  );
+  const response = await fetch(url, { credentials: "same-origin" });
+  if (!response.ok) {
+    placeholderEl.textContent = `Failed to load errors (${response.status})`;
+    return;
   }
+  const { errors } = await response.json();
+
+  placeholderEl.innerHTML =
+    renderErrorList(
+      errors.filter((error) => error.test_status === null),
+      "report-warnings-list",
+      "report-warning",
+      "Unable to run:"
+    ) +
+    renderErrorList(
+      errors.filter((error) => error.test_status === false),
+      "report-errors-list",
+      "report-error",
+      "Failed:"
+    );
+}
+
+/**
+ * Render a list of failed or unknown tests.
+ *
+ * @param {Array} errors errors to list
+ * @param {string} listClass class of the list wrapper
+ * @param {string} itemClass class of the list
+ * @param {string} title title of the list
+ * @return {string} list html
+ */
+function renderErrorList(errors, listClass, itemClass, title) {
+  if (errors.length === 0) {
+    return "";
+  }
+
+  const items = errors
+    .map(
+      (error) =>
+        `<li><a href="${escapeHtml(error.log_url)}">${escapeHtml(
+          error.name
+        )}</a></li>`
+    )
+    .join("");
+  return `
+    <div class="${listClass}">
+      <div class="${itemClass}">
+        <strong>${title}</strong>
+        <ul>${items}</ul>
+      </div>
+    </div>`;
+}
+
+/**
+ * Follow the status change stream and patch the summary and report cards
+ * in place.
+ *
+ * @param {string} url URL of the status stream
+ */
+function watchReports(url) {
+  if (!url || !window.EventSource) {
+    return;
+  }
+
+  const source = new EventSource(url);
+  source.addEventListener("report", (event) =>
+    updateReport(JSON.parse(event.data))
+  );
+  source.addEventListener("summary", (event) =>
+    updateSummary(JSON.parse(event.data))
+  );
+  source.addEventListener("reload", () => {
+    source.close();
+    window.location.reload();
+  });
+}
+
+/**
+ * Update the status class and text of a summary or report element.
+ *
+ * @param {HTMLElement} el element carrying a passed/failed/unknown class
+ * @param {boolean} passed new status
+ * @return {string} new status name
+ */
+function setStatusClass(el, passed) {
+  const statuses = { true: "passed", false: "failed" };
+  const status = statuses[passed] || "unknown";
+  el.classList.remove("passed", "failed", "unknown");
+  el.classList.add(status);
+  return status;
+}
+
+/**
+ * Patch the card of a report whose status changed.
+ *
+ * @param {object} report report_title_id, passed and updated of the report
+ */
+function updateReport(report) {
+  const card = reportCards.get(String(report.report_title_id));
+  if (!card) {
+    return;
+  }
+  const { el } = card;
+  Object.assign(card.report, report);
+
+  const status = setStatusClass(el, report.passed);
+  el.querySelector(".report-status").textContent =
+    status.charAt(0).toUpperCase() + status.slice(1);
+  const datetimeEl = el.querySelector(".report-datetime");
+  datetimeEl.innerHTML = "";
+  datetimeEl.append(isoDateToTimeEl(report.updated, { title: false }));
+
+  // Errors are loaded again the next time the details are expanded
+  el.querySelector(".report-errors-placeholder").innerHTML = "";
+  el.dataset.errorsLoaded = "false";
+}
+
+/**
+ * Patch the summary once the overall status changed.
+ *
+ * @param {object} summary passed and updated of all reports
+ */
+function updateSummary(summary) {
+  const summaryEl = document.querySelector(".reports-summary");
+  if (!summaryEl) {
+    window.location.reload();
+    return;
+  }
+
+  setStatusClass(summaryEl, summary.passed);
+  summaryEl.querySelector("h2").innerHTML = summary.passed
+    ? '<i class="fa fa-check-circle" aria-hidden="true"></i> All Tests Are Passing'
+    : '<i class="fa fa-exclamation-circle" aria-hidden="true"></i> Some Tests Are Failing';
+  setSummaryTime({ summary });
 }
@@ -0,0 +1,102 @@
+"""
+Compares building reports with the compact Report model against the
+previous Report class, which copied every field into its own attribute
+and parsed schedule_time up front:
+
+    python -m rb_status_plugin.tests.benchmarks.benchmark_report_model
+"""
+
+import datetime
+import json
+import timeit
+import tracemalloc
+
+from rb_status_plugin.core.report import Report
+
+REPORTS = 10000
+ROUNDS = 5
+
+report_json = json.dumps(
+    {
+        "report_title": "benchmark",
+        "report_title_id": "benchmark",
+        "description": "benchmark report",
+        "owner_name": "benchmark",
+        "owner_email": "benchmark@raybeam.com",
+        "subscribers": ["benchmark@raybeam.com"],
+        "tests": ["example_dag.python_print_date_0"],
+        "schedule_type": "daily",
+        "schedule_time": "07:00",
+        "schedule": "00 07 * * *",
+        "report_id": "rb_status_benchmark",
+    }
+)
+
+
+class LegacyReport:
+    """ The attribute-per-field Report class the model replaced """
+
+    def __init__(self, name):
+        self.name = name
+        self.__report_id = None
+        self.__report_title = None
+        self.__report_title_id = None
+        self.__description = None
+        self.__owner_name = None
+        self.__owner_email = None
+        self.__subscribers = None
+        self.__tests = None
+        self.__schedule_type = None
+        self.__schedule_time = None
+        self.__schedule_week_day = None
+        self.__schedule = None
+
+    def set_fields(self, v):
+        self.__report_id = v["report_id"]
+        self.__report_title = v["report_title"]
+        self.__report_title_id = v["report_title_id"]
+        self.__description = v["description"]
+        self.__owner_name = v["owner_name"]
+        self.__owner_email = v["owner_email"]
+        self.__subscribers = v["subscribers"]
+        self.__tests = v["tests"]
+        self.__schedule_type = v["schedule_type"]
+        if "daily" in self.__schedule_type:
+            self.__schedule_time = datetime.datetime.strptime(
+                v["schedule_time"], "%H:%M"
+            )
+        self.__schedule = v["schedule"]
+
+
+def build_legacy():
+    reports = []
+    for i in range(REPORTS):
+        r = LegacyReport(f"benchmark_{i}")
+        r.set_fields(json.loads(report_json))
+        reports.append(r)
+    return reports
+
+
+def build_compact():
+    return [Report(f"benchmark_{i}", json.loads(report_json)) for i in range(REPORTS)]
+
+
+def measure(label, build):
+    seconds = timeit.timeit(build, number=ROUNDS) / ROUNDS
+
+    tracemalloc.start()
+    reports = build()  # noqa: F841
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<20} {seconds * 1000:10.2f} ms {size / 1024 / 1024:10.2f} MiB")
+
+
+def main():
+    print(f"Building {REPORTS} reports")
+    measure("legacy", build_legacy)
+    measure("compact", build_compact)
+
+
+if __name__ == "__main__":
+    main()
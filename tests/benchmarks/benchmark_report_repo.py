@@ -0,0 +1,121 @@
+"""
+Measures VariablesReportRepo lookups on a Variable table crowded with
+unrelated rows.  Runs against the configured Airflow metadata database:
+
+    python -m rb_status_plugin.tests.benchmarks.benchmark_report_repo
+"""
+
+from airflow.models import Variable
+from airflow.utils.db import create_session
+
+import json
+import re
+import timeit
+
+from rb_status_plugin.core.report_repo import VariablesReportRepo
+
+UNRELATED_VARIABLES = 50000
+REPORTS = 50
+ROUNDS = 5
+BENCHMARK_PREFIX = "rb_benchmark_unrelated_"
+
+report_json = json.dumps(
+    {
+        "report_title": "benchmark",
+        "report_title_id": "benchmark",
+        "description": "benchmark report",
+        "owner_name": "benchmark",
+        "owner_email": "benchmark@raybeam.com",
+        "subscribers": ["benchmark@raybeam.com"],
+        "tests": ["example_dag.python_print_date_0"],
+        "schedule_type": "manual",
+        "schedule": None,
+    }
+)
+
+
+def scan_list(session):
+    """The previous list(): load every variable and filter in Python"""
+    reports = []
+    for var in session.query(Variable).all():
+        if re.search(r"^%s(.*)$" % VariablesReportRepo.report_prefix, var.key, re.I):
+            reports.append(json.loads(var.val))
+    return reports
+
+
+def scan_get(session, name):
+    """The previous get(): a linear scan for a single report"""
+    for var in session.query(Variable).all():
+        m = re.search(r"^%s(.*)$" % VariablesReportRepo.report_prefix, var.key, re.I)
+        if m and m.group(1) == name:
+            return json.loads(var.val)
+
+
+def populate(session):
+    session.bulk_insert_mappings(
+        Variable,
+        [
+            {"key": f"{BENCHMARK_PREFIX}{i}", "_val": "x" * 64}
+            for i in range(UNRELATED_VARIABLES)
+        ],
+    )
+    session.bulk_insert_mappings(
+        Variable,
+        [
+            {
+                "key": f"{VariablesReportRepo.report_prefix}benchmark_{i}",
+                "_val": report_json,
+            }
+            for i in range(REPORTS)
+        ],
+    )
+    session.commit()
+
+
+def cleanup(session):
+    session.query(Variable).filter(
+        Variable.key.like(f"{BENCHMARK_PREFIX}%")
+        | Variable.key.like(
+            f"{VariablesReportRepo.report_prefix}benchmark\\_%", escape="\\"
+        )
+    ).delete(synchronize_session=False)
+    session.commit()
+
+
+def report(label, seconds):
+    print(f"{label:<40} {seconds / ROUNDS * 1000:10.2f} ms")
+
+
+def main():
+    with create_session() as session:
+        populate(session)
+        try:
+            name = f"benchmark_{REPORTS - 1}"
+            report(
+                "list (python filter)",
+                timeit.timeit(lambda: scan_list(session), number=ROUNDS),
+            )
+            report(
+                "list (sql prefix filter)",
+                timeit.timeit(
+                    lambda: list(VariablesReportRepo.each_from_db(session)),
+                    number=ROUNDS,
+                ),
+            )
+            report(
+                "get (linear scan)",
+                timeit.timeit(lambda: scan_get(session, name), number=ROUNDS),
+            )
+            report(
+                "get (keyed lookup)",
+                timeit.timeit(
+                    lambda: VariablesReportRepo.get(name, session=session),
+                    number=ROUNDS,
+                ),
+            )
+        finally:
+            cleanup(session)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Measures the StatusSensor task instance lookup on a task_instance table
+holding a long history of runs, and prints the query plan of the bounded
+lookup.  Runs against the configured Airflow metadata database:
+
+    python -m rb_status_plugin.tests.benchmarks.benchmark_task_state
+"""
+
+from airflow.models.taskinstance import TaskInstance
+from airflow.utils import timezone
+from airflow.utils.db import create_session
+from airflow.utils.state import State
+
+import datetime
+import timeit
+
+from rb_status_plugin.core.helpers.task_state_helper import (
+    latest_task_state,
+    latest_task_state_query,
+)
+
+DAG_ID = "rb_benchmark_task_state"
+TASKS = 20
+RUNS = 5000
+ROUNDS = 50
+LOOKBACK = datetime.timedelta(days=2)
+PRIMARY_KEY_INDEXES = [
+    "task_instance_pkey",
+    "sqlite_autoindex_task_instance",
+    "PRIMARY",
+]
+
+start_date = timezone.datetime(2010, 1, 1)
+
+
+def full_lookup(session, task_id):
+    """The previous poke: load the latest full TaskInstance row"""
+    return (
+        session.query(TaskInstance)
+        .filter(TaskInstance.task_id == task_id, TaskInstance.dag_id == DAG_ID)
+        .order_by(TaskInstance.execution_date.desc())
+        .first()
+    )
+
+
+def populate(session):
+    for task in range(TASKS):
+        session.bulk_insert_mappings(
+            TaskInstance,
+            [
+                {
+                    "dag_id": DAG_ID,
+                    "task_id": f"task_{task}",
+                    "execution_date": start_date + datetime.timedelta(hours=run),
+                    "state": State.SUCCESS,
+                }
+                for run in range(RUNS)
+            ],
+        )
+    session.commit()
+
+
+def cleanup(session):
+    session.query(TaskInstance).filter(TaskInstance.dag_id == DAG_ID).delete(
+        synchronize_session=False
+    )
+    session.commit()
+
+
+def explain(session, query):
+    """ Returns the database's plan for query as text """
+    dialect = session.bind.dialect
+    compiled = query.statement.compile(dialect=dialect)
+    if compiled.positional:
+        params = [compiled.params[name] for name in compiled.positiontup]
+    else:
+        params = compiled.params
+    prefix = "EXPLAIN QUERY PLAN " if dialect.name == "sqlite" else "EXPLAIN "
+    rows = session.connection().execute(prefix + str(compiled), params).fetchall()
+    return "\n".join(" ".join(str(col) for col in row) for row in rows)
+
+
+def report(label, seconds):
+    print(f"{label:<40} {seconds / ROUNDS * 1000:10.2f} ms")
+
+
+def main():
+    with create_session() as session:
+        populate(session)
+        try:
+            task_id = f"task_{TASKS - 1}"
+            since = start_date + datetime.timedelta(hours=RUNS) - LOOKBACK
+            report(
+                "full row, unbounded",
+                timeit.timeit(lambda: full_lookup(session, task_id), number=ROUNDS),
+            )
+            report(
+                "columns, unbounded",
+                timeit.timeit(
+                    lambda: latest_task_state(DAG_ID, task_id, session=session),
+                    number=ROUNDS,
+                ),
+            )
+            report(
+                f"columns, {LOOKBACK} lookback",
+                timeit.timeit(
+                    lambda: latest_task_state(
+                        DAG_ID, task_id, since=since, session=session
+                    ),
+                    number=ROUNDS,
+                ),
+            )
+
+            query = latest_task_state_query(DAG_ID, task_id, since, session)
+            plan = explain(session, query)
+            print(plan)
+            uses_pk = any(index in plan for index in PRIMARY_KEY_INDEXES)
+            print(f"Bounded lookup uses the primary key index: {uses_pk}")
+        finally:
+            cleanup(session)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import pytest
+
+from rb_status_plugin.core.models import create_tables
+
+
+@pytest.fixture(scope="session", autouse=True)
+def plugin_tables():
+    """ The plugin-owned tables, which bin/setup creates on real installs """
+    create_tables()
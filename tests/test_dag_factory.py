@@ -0,0 +1,136 @@
+import datetime
+import json
+import unittest
+import pytest
+
+from airflow.models import Variable
+
+from rb_status_plugin.core.dag_factory import (
+    PROBE_DAG_ID,
+    DagCache,
+    create_probe_dag,
+    load_dags,
+    report_shard,
+)
+from rb_status_plugin.core.report import Report
+
+
+@pytest.mark.compatibility
+class DagCacheTest(unittest.TestCase):
+    """
+    Class for testing that report DAGs are only built again once their
+    report changes.
+    """
+
+    default_args = {"owner": "airflow", "start_date": datetime.datetime(2020, 4, 1)}
+
+    def setUp(self):
+        self.cache = DagCache()
+
+    def report(self, tests):
+        return Report("cached", {"schedule": "@daily", "tests": list(tests)})
+
+    def test_unchanged_report_is_reused(self):
+        dag = self.cache.get(self.report(["a.b"]), self.default_args)
+        self.assertIs(self.cache.get(self.report(["a.b"]), self.default_args), dag)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_changed_report_is_rebuilt(self):
+        dag = self.cache.get(self.report(["a.b"]), self.default_args)
+        changed = self.cache.get(self.report(["a.b", "a.c"]), self.default_args)
+        self.assertIsNot(changed, dag)
+        self.assertIn("test_a.c", changed.task_ids)
+
+    def test_report_tuning_is_applied(self):
+        report = self.report(["a.b"])
+        report.pool = "reports"
+        report.priority_weight = 5
+        report.poke_interval = "30"
+        report.timeout = 600
+        report.sensor_mode = "poke"
+
+        sensor = self.cache.get(report, self.default_args).get_task("test_a.b")
+        self.assertEqual(
+            (sensor.pool, sensor.priority_weight, sensor.poke_interval),
+            ("reports", 5, 30),
+        )
+        self.assertEqual((sensor.timeout, sensor.mode), (600, "poke"))
+
+    def test_invalid_report_tuning_is_rejected(self):
+        for (key, value) in [("sensor_mode", "sometimes"), ("poke_interval", "-5")]:
+            report = self.report(["a.b"])
+            setattr(report, key, value)
+            with self.assertRaises(ValueError):
+                self.cache.get(report, self.default_args)
+
+    def test_removed_report_is_pruned(self):
+        dag = self.cache.get(self.report(["a.b"]), self.default_args)
+        self.cache.prune([])
+        self.assertIsNot(self.cache.get(self.report(["a.b"]), self.default_args), dag)
+
+    def test_prune_keeps_other_shards(self):
+        names = [f"report_{i}" for i in range(8)]
+        shards = {name: report_shard(name, 2) for name in names}
+        for name in names:
+            self.cache._dags[name] = ("key", None)
+
+        self.cache.prune([], shard=0, shards=2)
+        self.assertEqual(
+            set(self.cache._dags), {name for name in names if shards[name] == 1}
+        )
+
+
+@pytest.mark.compatibility
+class LoadDagsTest(unittest.TestCase):
+    """
+    Class for testing that a broken report does not take down its shard.
+    """
+
+    default_args = {"owner": "airflow", "start_date": datetime.datetime(2020, 4, 1)}
+    reports = {"rb_status_broken": ["no_dot"], "rb_status_fine": ["a.b"]}
+
+    def setUp(self):
+        for (key, tests) in self.reports.items():
+            Variable.set(key, json.dumps({"schedule": None, "tests": tests}))
+
+    def tearDown(self):
+        for key in self.reports:
+            Variable.delete(key)
+
+    def test_broken_report_is_skipped(self):
+        with self.assertLogs(level="ERROR"):
+            dags = load_dags(self.default_args)
+        self.assertIn("fine", dags)
+        self.assertNotIn("broken", dags)
+
+
+@pytest.mark.compatibility
+class ReportShardTest(unittest.TestCase):
+    """
+    Class for testing that reports are split over shards by a stable hash.
+    """
+
+    def test_shard_is_stable(self):
+        self.assertEqual(report_shard("rb_status_report", 4), 1)
+        self.assertEqual(report_shard("rb_status_report", 1), 0)
+
+    def test_shards_cover_all_reports(self):
+        shards = {report_shard(f"report_{i}", 4) for i in range(100)}
+        self.assertEqual(shards, {0, 1, 2, 3})
+
+
+@pytest.mark.compatibility
+class ProbeDagTest(unittest.TestCase):
+    """
+    Class for testing that the probe DAG checks each distinct test once.
+    """
+
+    default_args = {"owner": "airflow", "start_date": datetime.datetime(2020, 4, 1)}
+
+    def test_one_sensor_per_test(self):
+        dag = create_probe_dag(["a.b", "a.c"], self.default_args)
+        self.assertEqual(dag.dag_id, PROBE_DAG_ID)
+        self.assertEqual(
+            set(dag.task_ids), {"start_dag", "prune_results", "test_a.b", "test_a.c"}
+        )
+        self.assertEqual(dag.max_active_runs, 1)
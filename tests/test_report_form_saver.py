@@ -1,9 +1,11 @@
 from airflow.models import Variable
+from flask import Flask, get_flashed_messages
 
 import datetime
 import copy
 import pendulum
 import pytest
+import unittest
 
 from rb_status_plugin.core.report_form_saver import ReportFormSaver
 
@@ -43,6 +45,12 @@ class ReportSaveTest:
                     ]
                 }
             ),
+            "batch_tests": AttributeDict({"data": False}),
+            "pool": AttributeDict({"data": ""}),
+            "sensor_mode": AttributeDict({"data": ""}),
+            "poke_interval": AttributeDict({"data": None}),
+            "timeout": AttributeDict({"data": None}),
+            "priority_weight": AttributeDict({"data": None}),
             "schedule_type": AttributeDict({"data": "custom"}),
             "schedule_timezone": AttributeDict({"data": "America/Chicago"}),
             "schedule_custom": AttributeDict({"data": "* * * 1 *"}),
@@ -66,6 +74,12 @@ class ReportSaveTest:
                     ]
                 }
             ),
+            "batch_tests": AttributeDict({"data": False}),
+            "pool": AttributeDict({"data": ""}),
+            "sensor_mode": AttributeDict({"data": ""}),
+            "poke_interval": AttributeDict({"data": None}),
+            "timeout": AttributeDict({"data": None}),
+            "priority_weight": AttributeDict({"data": None}),
             "schedule_type": AttributeDict({"data": "custom"}),
             "schedule_timezone": AttributeDict({"data": "America/Chicago"}),
             "schedule_custom": AttributeDict({"data": "* * * 1 1"}),
@@ -90,6 +104,12 @@ class ReportSaveTest:
                     ]
                 }
             ),
+            "batch_tests": AttributeDict({"data": False}),
+            "pool": AttributeDict({"data": ""}),
+            "sensor_mode": AttributeDict({"data": ""}),
+            "poke_interval": AttributeDict({"data": None}),
+            "timeout": AttributeDict({"data": None}),
+            "priority_weight": AttributeDict({"data": None}),
             "schedule_type": AttributeDict({"data": "daily"}),
             "schedule_timezone": AttributeDict({"data": "America/Chicago"}),
             "schedule_time": AttributeDict(
@@ -117,6 +137,12 @@ class ReportSaveTest:
                     ]
                 }
             ),
+            "batch_tests": AttributeDict({"data": False}),
+            "pool": AttributeDict({"data": ""}),
+            "sensor_mode": AttributeDict({"data": ""}),
+            "poke_interval": AttributeDict({"data": None}),
+            "timeout": AttributeDict({"data": None}),
+            "priority_weight": AttributeDict({"data": None}),
             "schedule_type": AttributeDict({"data": "daily"}),
             "schedule_timezone": AttributeDict({"data": "America/Chicago"}),
             "schedule_time": AttributeDict(
@@ -148,6 +174,12 @@ class ReportSaveTest:
                     ]
                 }
             ),
+            "batch_tests": AttributeDict({"data": False}),
+            "pool": AttributeDict({"data": ""}),
+            "sensor_mode": AttributeDict({"data": ""}),
+            "poke_interval": AttributeDict({"data": None}),
+            "timeout": AttributeDict({"data": None}),
+            "priority_weight": AttributeDict({"data": None}),
             "schedule_type": AttributeDict({"data": "weekly"}),
             "schedule_timezone": AttributeDict({"data": "America/Chicago"}),
             "schedule_time": AttributeDict(
@@ -374,3 +406,38 @@ class ReportSaveTest:
         self.assertEqual(
             updated_report.schedule_custom.data, report_airflow_variable["schedule"]
         )
+
+
+@pytest.mark.compatibility
+class SensorFieldsTest(unittest.TestCase):
+    """
+    Class for testing that invalid sensor settings are rejected.
+    """
+
+    app = Flask(__name__)
+    app.secret_key = "rb_status_test"
+
+    def check(self, **fields):
+        form = copy.deepcopy(ReportSaveTest.report_form_sample)
+        for (field_name, value) in fields.items():
+            form[field_name].data = value
+        with self.app.test_request_context():
+            valid = ReportFormSaver(form).check_sensor_fields()
+            return valid, get_flashed_messages()
+
+    def test_valid_settings(self):
+        self.assertEqual(
+            self.check(poke_interval=30, timeout=600, sensor_mode="poke"), (True, [])
+        )
+
+    def test_invalid_poke_interval(self):
+        self.assertEqual(
+            self.check(poke_interval=-5),
+            (False, ["Error: poke_interval must be at least 1 second."]),
+        )
+
+    def test_unknown_sensor_mode(self):
+        self.assertEqual(
+            self.check(sensor_mode="sometimes"),
+            (False, ["Error: sensor_mode (sometimes) is not valid."]),
+        )
@@ -0,0 +1,72 @@
+from airflow import settings
+from sqlalchemy import event
+
+import datetime
+import unittest
+import pytest
+
+from rb_status_plugin.core.report_instance import ReportInstance
+
+
+class DummyDagRun:
+    """
+    Class for mirroring the DagRun attributes ReportInstance reads
+    """
+
+    id = -1
+    dag_id = "rb_status_query_count"
+    execution_date = datetime.datetime(2020, 4, 19)
+
+
+@pytest.mark.compatibility
+class ReportInstanceTest(unittest.TestCase):
+    """
+    Class for testing that a ReportInstance evaluates its tests once.
+    """
+
+    def setUp(self):
+        self.statements = []
+        event.listen(settings.engine, "before_cursor_execute", self.count_query)
+
+    def tearDown(self):
+        event.remove(settings.engine, "before_cursor_execute", self.count_query)
+
+    def count_query(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def test_errors_are_loaded_once(self):
+        """
+        Test that passed and errors share a single evaluation
+        """
+        ri = ReportInstance(DummyDagRun())
+        self.assertEqual(True, ri.passed)
+        queries = len(self.statements)
+        # The results table, then the XComs of runs without results there
+        self.assertEqual(3, queries)
+
+        self.assertEqual([], ri.errors())
+        self.assertEqual(True, ri.passed)
+        self.assertEqual(queries, len(self.statements))
+
+    def test_refresh(self):
+        """
+        Test that refresh evaluates the errors again
+        """
+        ri = ReportInstance(DummyDagRun())
+        ri.errors()
+        ri.refresh()
+        ri.errors()
+        self.assertEqual(6, len(self.statements))
+
+    def test_preloaded_results(self):
+        """
+        Test that bulk loaded results need no further queries
+        """
+        results = [
+            {"id": 1, "name": "test_a.b", "log_url": None, "test_status": True},
+            {"id": 2, "name": "test_a.c", "log_url": "url", "test_status": False},
+        ]
+        ri = ReportInstance(DummyDagRun(), results)
+        self.assertEqual(False, ri.passed)
+        self.assertEqual([results[1]], ri.errors())
+        self.assertEqual(0, len(self.statements))
@@ -1,8 +1,12 @@
-from rb_status_plugin.core.report_repo import VariablesReportRepo
+from rb_status_plugin.core.report_repo import ReportTestIndex, VariablesReportRepo
 from rb_status_plugin.core.report import Report
+from airflow.models import Variable
+from airflow.utils.db import create_session
 
 import json
 import pytest
+import timeit
+import unittest
 
 
 @pytest.mark.compatibility
@@ -58,3 +62,51 @@ class VariablesReportRepoTest:
         parsed = json.loads(self.dummy_test)
         r = VariablesReportRepo.to_report("bob", parsed)
         self.assertIsInstance(r, Report)
+
+
+@pytest.mark.compatibility
+class ReportTestIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = ReportTestIndex()
+        self.index.add("rb_status_a", ["dag_x.task_y", "dag_x.task_z"])
+        self.index.add("rb_status_b", ["dag_x.task_y"])
+
+    def test_reports_for_test(self):
+        self.assertEqual(
+            self.index.get("dag_x", "task_y"), ["rb_status_a", "rb_status_b"]
+        )
+        self.assertEqual(self.index.get("dag_x", "task_z"), ["rb_status_a"])
+        self.assertEqual(self.index.get("dag_x", "unknown"), [])
+
+    def test_save_replaces_tests(self):
+        self.index.add("rb_status_a", ["dag_x.task_z"])
+        self.assertEqual(self.index.get("dag_x", "task_y"), ["rb_status_b"])
+
+    def test_delete(self):
+        self.index.remove("rb_status_b")
+        self.assertEqual(self.index.get("dag_x", "task_y"), ["rb_status_a"])
+
+    def test_lookup_time(self):
+        for i in range(10000):
+            self.index.add(f"rb_status_{i}", [f"dag_{i % 100}.task_{i % 7}"])
+        seconds = timeit.timeit(lambda: self.index.get("dag_1", "task_1"), number=1000)
+        self.assertLess(seconds / 1000, 0.001)
+
+
+@pytest.mark.compatibility
+class GenerationStampTest(unittest.TestCase):
+    key = "rb_status_stamp_test"
+
+    def tearDown(self):
+        Variable.delete(self.key)
+
+    def test_in_place_edit_changes_stamp(self):
+        # an edit that keeps the value's length, as made by the Variables UI
+        Variable.set(self.key, json.dumps({"schedule_time": "08:00"}))
+        with create_session() as session:
+            before = VariablesReportRepo.generation_stamp(session)
+            variable = session.query(Variable).filter(Variable.key == self.key).one()
+            variable.set_val(json.dumps({"schedule_time": "09:00"}))
+            session.flush()
+            after = VariablesReportRepo.generation_stamp(session)
+        self.assertNotEqual(before, after)
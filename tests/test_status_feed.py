@@ -0,0 +1,71 @@
+from rb_status_plugin.core.status_feed import StatusFeed
+
+import pytest
+import unittest
+
+
+def status_data(passed, *reports):
+    return {
+        "summary": {"passed": passed, "updated": "2020-01-02T00:00:00+00:00"},
+        "reports": [
+            {
+                "report_title_id": report_title_id,
+                "passed": report_passed,
+                "updated": updated,
+                "errors": [],
+            }
+            for (report_title_id, report_passed, updated) in reports
+        ],
+    }
+
+
+@pytest.mark.compatibility
+class StatusFeedTest(unittest.TestCase):
+    def test_first_update_is_the_baseline(self):
+        feed = StatusFeed()
+        feed.update(status_data(True, ("a", True, "2020-01-01")))
+        self.assertEqual(feed.sequence(), 0)
+        self.assertEqual(feed.events_after(0), [])
+
+    def test_changed_report_and_summary(self):
+        feed = StatusFeed()
+        feed.update(status_data(True, ("a", True, "1"), ("b", True, "1")))
+        feed.update(status_data(False, ("a", True, "1"), ("b", False, "2")))
+
+        events = feed.events_after(0)
+        self.assertEqual(
+            [(sequence, event) for (sequence, event, _) in events],
+            [(1, "report"), (2, "summary")],
+        )
+        self.assertEqual(
+            events[0][2], {"report_title_id": "b", "passed": False, "updated": "2"}
+        )
+        self.assertEqual(feed.events_after(1), events[1:])
+
+    def test_new_report_reloads(self):
+        feed = StatusFeed()
+        feed.update(status_data(True, ("a", True, "1")))
+        feed.update(status_data(True, ("a", True, "1"), ("b", True, "1")))
+        self.assertEqual([e[1] for e in feed.events_after(0)], ["reload"])
+
+    def test_missed_events_reload(self):
+        feed = StatusFeed(backlog=1)
+        feed.update(status_data(True, ("a", True, "1")))
+        feed.update(status_data(True, ("a", True, "2")))
+        feed.update(status_data(True, ("a", True, "3")))
+        self.assertEqual(feed.events_after(0), [(2, "reload", {})])
+        self.assertEqual([e[1] for e in feed.events_after(1)], ["report"])
+
+    def test_resume_from_own_event(self):
+        feed = StatusFeed()
+        feed.update(status_data(True, ("a", True, "1")))
+        feed.update(status_data(True, ("a", True, "2")))
+        self.assertEqual(feed.resume(feed.event_id(0)), 0)
+        self.assertEqual(feed.resume(None), 1)
+
+    def test_resume_from_other_feed_reloads(self):
+        # a reconnect landing on another webserver worker
+        (feed, other) = (StatusFeed(), StatusFeed())
+        self.assertIsNone(feed.resume(other.event_id(0)))
+        self.assertIsNone(feed.resume(feed.event_id(40)))
+        self.assertIsNone(feed.resume("40"))
@@ -1,12 +1,19 @@
 from datetime import datetime, timedelta
 import pytest
+import unittest
 
 from airflow.operators.dummy_operator import DummyOperator
 from airflow.models.taskinstance import TaskInstance
+from airflow.utils import timezone
+from airflow.utils.db import create_session
 from airflow.utils.state import State
 from airflow import DAG
 
 from rb_status_plugin.sensors.status_sensor import StatusSensor
+from rb_status_plugin.sensors.status_batch_sensor import StatusBatchSensor
+from rb_status_plugin.sensors.probe_result_sensor import ProbeResultSensor
+from rb_status_plugin.core.models import ResultRecord
+from rb_status_plugin.core.helpers.task_state_helper import record_test_state
 
 # Default settings applied to all tests
 default_args = {
@@ -20,6 +27,31 @@ default_args = {
 }
 
 
+def create_sensor_instance(sensor):
+    """
+    Creates a task instance of a sensor in a new run of its report DAG
+    """
+    execution_date = timezone.utcnow()
+    sensor.dag.create_dagrun(
+        run_id=f"test_{execution_date.isoformat()}",
+        execution_date=execution_date,
+        state=State.RUNNING,
+    )
+    return TaskInstance(task=sensor, execution_date=execution_date)
+
+
+def get_results(sensor_ti):
+    """
+    Returns the results a sensor saved, as a dict of test to status
+    """
+    dag_run_id = sensor_ti.get_dagrun().id
+    with create_session() as session:
+        records = session.query(ResultRecord).filter(
+            ResultRecord.dag_run_id == dag_run_id
+        )
+        return {record.test: record.status for record in records}
+
+
 @pytest.mark.compatibility
 class SensorTest:
     rb_status_dag = DAG(
@@ -69,11 +101,11 @@ class SensorTest:
         sensor = self.__create_sensor(dummy_success, self.rb_status_dag)
 
         self.__create_task_instance_with_state(dummy_success, state)
-        sensor_ti = self.__create_task_instance(sensor)
+        sensor_ti = create_sensor_instance(sensor)
 
         op_result = sensor.poke(context=sensor_ti.get_template_context())
 
-        test_result = sensor_ti.xcom_pull(key="rb_status_test_task_status")
+        test_result = get_results(sensor_ti)[f"test_dag.dummy_{state}"]
 
         self.assertEqual(expected_test_response, test_result)
         self.assertEqual(expected_operational_response, op_result)
@@ -89,10 +121,10 @@ class SensorTest:
         sensor = self.__create_sensor(dummy_success, self.rb_status_dag)
 
         self.__create_task_instance_with_state(dummy_success, state)
-        sensor_ti = self.__create_task_instance(sensor)
+        sensor_ti = create_sensor_instance(sensor)
 
         op_result = sensor.poke(context=sensor_ti.get_template_context())
-        test_result = sensor_ti.xcom_pull(key="rb_status_test_task_status")
+        test_result = get_results(sensor_ti)[f"test_dag.dummy_{state}"]
 
         self.assertEqual(expected_test_response, test_result)
         self.assertEqual(expected_operational_response, op_result)
@@ -108,7 +140,7 @@ class SensorTest:
         sensor = self.__create_sensor(dummy_success, self.rb_status_dag)
 
         self.__create_task_instance_with_state(dummy_success, state)
-        sensor_ti = self.__create_task_instance(sensor)
+        sensor_ti = create_sensor_instance(sensor)
 
         op_result = sensor.poke(context=sensor_ti.get_template_context())
 
@@ -121,9 +153,239 @@ class SensorTest:
         expected_test_response = None
 
         sensor = self.__create_invalid_test_sensor(self.rb_status_dag)
-        sensor_ti = self.__create_task_instance(sensor)
-
-        test_result = sensor_ti.xcom_pull(key="rb_status_test_task_status")
+        sensor_ti = create_sensor_instance(sensor)
 
         self.assertRaises(AttributeError, sensor.poke, sensor_ti.get_template_context())
+
+        test_result = get_results(sensor_ti)["does_not_exist.imaginary_task"]
         self.assertEqual(expected_test_response, test_result)
+
+
+@pytest.mark.compatibility
+class BatchSensorTest(unittest.TestCase):
+    rb_status_dag = DAG(
+        "rb_status_batch_dag", schedule_interval=None, default_args=default_args
+    )
+    test_dag = DAG("batch_test_dag", schedule_interval=None, default_args=default_args)
+
+    def test_results_of_all_tests(self):
+        # tests that StatusBatchSensor records every test at once
+        # and keeps poking while a test is still running
+        execution_date = datetime.now()
+        tests = []
+        for state in [State.SUCCESS, State.FAILED, State.RUNNING]:
+            dummy = DummyOperator(task_id=f"dummy_{state}", dag=self.test_dag)
+            TaskInstance(task=dummy, execution_date=execution_date).set_state(state)
+            tests.append(f"{self.test_dag.dag_id}.{dummy.task_id}")
+        tests.append(f"{self.test_dag.dag_id}.imaginary_task")
+
+        sensor = StatusBatchSensor(
+            task_id="test_all", tests=tests, dag=self.rb_status_dag
+        )
+        sensor_ti = create_sensor_instance(sensor)
+
+        op_result = sensor.poke(context=sensor_ti.get_template_context())
+        results = get_results(sensor_ti)
+
+        self.assertEqual(False, op_result)
+        self.assertEqual([True, False, None, None], [results[test] for test in tests])
+
+    def test_error_keeps_known_results(self):
+        # tests that a failed query only records unknown results for the
+        # tests without a result, as a sensor rescheduled between pokes
+        execution_date = datetime.now()
+        dummy = DummyOperator(task_id="dummy_known", dag=self.test_dag)
+        TaskInstance(task=dummy, execution_date=execution_date).set_state(State.SUCCESS)
+        tests = [f"{self.test_dag.dag_id}.dummy_known", "batch_test_dag.pending"]
+
+        sensor = StatusBatchSensor(
+            task_id="test_all_known", tests=tests, dag=self.rb_status_dag
+        )
+        sensor_ti = create_sensor_instance(sensor)
+        sensor.poke(context=sensor_ti.get_template_context())
+
+        rescheduled = FailingBatchSensor(
+            task_id="test_all_failing", tests=tests, dag=self.rb_status_dag
+        )
+        with self.assertRaises(RuntimeError):
+            rescheduled.poke(context=sensor_ti.get_template_context())
+
+        self.assertEqual(get_results(sensor_ti), {tests[0]: True, tests[1]: None})
+
+
+class FailingBatchSensor(StatusBatchSensor):
+    """ StatusBatchSensor whose task instance query fails """
+
+    def latest_task_instances(self, context, session=None):
+        raise RuntimeError("database went away")
+
+
+@pytest.mark.compatibility
+class BackoffTest(unittest.TestCase):
+    def test_poke_interval_grows_to_cap(self):
+        # tests that a waiting sensor doubles its poke interval, with jitter,
+        # up to max_poke_interval
+        sensor = StatusSensor(
+            task_id="test_backoff",
+            test_dag_id="test_dag",
+            test_task_id="dummy",
+            poke_interval=10,
+            max_poke_interval=40,
+        )
+        for (low, high) in [(5, 10), (10, 20), (20, 40), (20, 40)]:
+            sensor.back_off(context={})
+            self.assertTrue(low <= sensor.poke_interval <= high)
+
+
+@pytest.mark.compatibility
+class AwaitingRunTest(unittest.TestCase):
+    test_dag = DAG(
+        "awaiting_test_dag", schedule_interval=None, default_args=default_args
+    )
+
+    def test_waits_only_for_dags_that_ran_before(self):
+        # tests that a DAG is waited for when its latest run is older than
+        # the window, and never when it has not run at all
+        execution_date = timezone.utcnow() - timedelta(days=2)
+        self.test_dag.create_dagrun(
+            run_id=f"test_{execution_date.isoformat()}",
+            execution_date=execution_date,
+            state=State.SUCCESS,
+        )
+        dag_ids = ["awaiting_test_dag", "never_ran_dag"]
+        with create_session() as session:
+            waiting = StatusSensor.dags_awaiting_run(
+                dag_ids, timezone.utcnow() - timedelta(days=1), session
+            )
+            in_window = StatusSensor.dags_awaiting_run(dag_ids, execution_date, session)
+            unbounded = StatusSensor.dags_awaiting_run(dag_ids, None, session)
+
+        self.assertEqual(waiting, {"awaiting_test_dag"})
+        self.assertEqual(in_window, set())
+        self.assertEqual(unbounded, set())
+
+
+@pytest.mark.compatibility
+class CallbackTest(unittest.TestCase):
+    rb_status_dag = DAG(
+        "rb_status_callback_dag", schedule_interval=None, default_args=default_args
+    )
+    test_dag = DAG(
+        "callback_test_dag", schedule_interval=None, default_args=default_args
+    )
+
+    def test_recorded_state_resolves(self):
+        # tests that a test whose callback recorded a finished run is
+        # resolved from the record, without a task instance to poll
+        dummy = DummyOperator(task_id="dummy_recorded", dag=self.test_dag)
+        ti = TaskInstance(task=dummy, execution_date=datetime.now())
+        ti.state = State.FAILED
+        record_test_state({"ti": ti})
+
+        sensor = StatusSensor(
+            task_id="test_callback_test_dag.dummy_recorded",
+            test_dag_id="callback_test_dag",
+            test_task_id="dummy_recorded",
+            dag=self.rb_status_dag,
+        )
+        sensor_ti = create_sensor_instance(sensor)
+
+        op_result = sensor.poke(context=sensor_ti.get_template_context())
+        test_result = get_results(sensor_ti)["callback_test_dag.dummy_recorded"]
+
+        self.assertEqual(True, op_result)
+        self.assertEqual(False, test_result)
+
+    def test_stale_record_is_polled(self):
+        # tests that a finished record is not trusted once a later run of
+        # the test's DAG exists, e.g. one whose task the scheduler marked
+        # upstream_failed without firing a callback
+        dummy = DummyOperator(task_id="dummy_stale", dag=self.test_dag)
+        yesterday = TaskInstance(
+            task=dummy, execution_date=timezone.utcnow() - timedelta(1)
+        )
+        yesterday.state = State.SUCCESS
+        record_test_state({"ti": yesterday})
+        execution_date = timezone.utcnow()
+        self.test_dag.create_dagrun(
+            run_id=f"test_{execution_date.isoformat()}",
+            execution_date=execution_date,
+            state=State.RUNNING,
+        )
+        TaskInstance(task=dummy, execution_date=execution_date).set_state(
+            State.UPSTREAM_FAILED
+        )
+
+        sensor = StatusSensor(
+            task_id="test_callback_test_dag.dummy_stale",
+            test_dag_id="callback_test_dag",
+            test_task_id="dummy_stale",
+            dag=self.rb_status_dag,
+        )
+        sensor_ti = create_sensor_instance(sensor)
+
+        op_result = sensor.poke(context=sensor_ti.get_template_context())
+        test_result = get_results(sensor_ti)["callback_test_dag.dummy_stale"]
+
+        self.assertEqual(True, op_result)
+        self.assertEqual(False, test_result)
+
+
+@pytest.mark.compatibility
+class ProbeTest(unittest.TestCase):
+    probe_dag = DAG(
+        "rb_status__probe_test", schedule_interval=None, default_args=default_args
+    )
+    rb_status_dag = DAG(
+        "rb_status_probe_report", schedule_interval=None, default_args=default_args
+    )
+    test_dag = DAG("probe_test_dag", schedule_interval=None, default_args=default_args)
+
+    def test_report_collects_probed_results(self):
+        # tests that a report run takes the results recorded by the probe
+        # DAG, and keeps waiting for tests that were not probed yet
+        dummy = DummyOperator(task_id="dummy_probed", dag=self.test_dag)
+        TaskInstance(task=dummy, execution_date=datetime.now()).set_state(State.SUCCESS)
+        probe = StatusSensor(
+            task_id="test_probe_test_dag.dummy_probed",
+            test_dag_id="probe_test_dag",
+            test_task_id="dummy_probed",
+            dag=self.probe_dag,
+        )
+        probe_ti = create_sensor_instance(probe)
+        probe.poke(context=probe_ti.get_template_context())
+
+        tests = ["probe_test_dag.dummy_probed", "probe_test_dag.not_probed"]
+        sensor = ProbeResultSensor(
+            task_id="collect_results",
+            tests=tests,
+            probe_dag_id=self.probe_dag.dag_id,
+            dag=self.rb_status_dag,
+        )
+        sensor_ti = create_sensor_instance(sensor)
+
+        op_result = sensor.poke(context=sensor_ti.get_template_context())
+
+        self.assertEqual(False, op_result)
+        self.assertEqual({tests[0]: True}, get_results(sensor_ti))
+
+    def test_old_probe_results_are_pruned(self):
+        # tests that pruning drops the probe's results of runs before the
+        # cutoff, so reports no longer see them
+        dummy = DummyOperator(task_id="dummy_pruned", dag=self.test_dag)
+        TaskInstance(task=dummy, execution_date=datetime.now()).set_state(State.SUCCESS)
+        probe = StatusSensor(
+            task_id="test_probe_test_dag.dummy_pruned",
+            test_dag_id="probe_test_dag",
+            test_task_id="dummy_pruned",
+            dag=self.probe_dag,
+        )
+        probe_ti = create_sensor_instance(probe)
+        probe.poke(context=probe_ti.get_template_context())
+        tests = ["probe_test_dag.dummy_pruned"]
+
+        ResultRecord.delete_before(
+            self.probe_dag.dag_id, timezone.utcnow() + timedelta(days=1)
+        )
+
+        self.assertEqual({}, ResultRecord.latest_of_dag(self.probe_dag.dag_id, tests))
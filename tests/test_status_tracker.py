@@ -0,0 +1,109 @@
+import datetime
+import unittest
+import pytest
+
+from rb_status_plugin.core.status_tracker import StatusTracker
+
+
+class DummyInstance:
+    """
+    Class for mirroring the ReportInstance attributes StatusTracker reads
+    """
+
+    def __init__(self, day, errors=()):
+        self.updated = datetime.datetime(2020, 4, day)
+        self._errors = list(errors)
+
+    def errors(self):
+        return self._errors
+
+
+class DummyReport:
+    def __init__(self, dag_id):
+        self.dag_id = dag_id
+
+
+class FlakyTracker(StatusTracker):
+    """
+    StatusTracker seeing one report run finish, whose first evaluation
+    fails with a database error
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.evaluations = 0
+        self.scans = [{"rb_status_a": (datetime.datetime(2020, 4, 2), 1)}]
+
+    def finished_since(self, mark, session=None):
+        seen = self.scans[0] if len(self.scans) == 1 else self.scans.pop(0)
+        ends = [end for (end, _) in seen.values()]
+        return seen, max(ends + ([mark] if mark else []))
+
+    def evaluate(self, reports):
+        self.evaluations += 1
+        if self.evaluations == 1:
+            raise RuntimeError("database went away")
+        return {report.dag_id: DummyInstance(2) for report in reports}, {}
+
+
+@pytest.mark.compatibility
+class StatusTrackerTest(unittest.TestCase):
+    """
+    Class for testing that the summary follows merged and removed instances.
+    """
+
+    def setUp(self):
+        self.tracker = StatusTracker()
+
+    def summary(self):
+        return (not self.tracker._failed, self.tracker._updated)
+
+    def test_merge_keeps_summary(self):
+        self.tracker.merge("rb_status_a", DummyInstance(1))
+        self.tracker.merge("rb_status_b", DummyInstance(2, errors=["test"]))
+        self.assertEqual(self.summary(), (False, datetime.datetime(2020, 4, 2)))
+
+        self.tracker.merge("rb_status_b", DummyInstance(3))
+        self.assertEqual(self.summary(), (True, datetime.datetime(2020, 4, 3)))
+
+    def test_remove_latest_reduces_updated(self):
+        self.tracker.merge("rb_status_a", DummyInstance(1))
+        self.tracker.merge("rb_status_b", DummyInstance(2, errors=["test"]))
+        self.tracker.remove("rb_status_b")
+        self.assertEqual(self.summary(), (True, datetime.datetime(2020, 4, 1)))
+
+        self.tracker.remove("rb_status_a")
+        self.assertEqual(self.summary(), (True, None))
+
+    def test_instance_moving_back(self):
+        self.tracker.merge("rb_status_a", DummyInstance(1))
+        self.tracker.merge("rb_status_b", DummyInstance(3))
+        self.tracker.merge("rb_status_b", DummyInstance(2))
+        self.assertEqual(self.summary(), (True, datetime.datetime(2020, 4, 2)))
+
+    def test_failed_update_keeps_mark(self):
+        tracker = FlakyTracker()
+        reports = [DummyReport("rb_status_a")]
+        with self.assertRaises(RuntimeError):
+            tracker.update(reports)
+        self.assertIsNone(tracker._mark)
+
+        (instances, summary, failures) = tracker.update(reports)
+        self.assertEqual(set(instances), {"rb_status_a"})
+        self.assertEqual(summary, (True, datetime.datetime(2020, 4, 2)))
+        self.assertEqual(tracker._mark, datetime.datetime(2020, 4, 2))
+
+    def test_late_run_is_evaluated(self):
+        # a run committed after the mark moved past its end_date still
+        # changes its report's runs within the grace period
+        tracker = FlakyTracker()
+        tracker.evaluations = 1
+        tracker.scans = [
+            {"rb_status_a": (datetime.datetime(2020, 4, 2), 1)},
+            {"rb_status_a": (datetime.datetime(2020, 4, 2), 1)},
+            {"rb_status_a": (datetime.datetime(2020, 4, 2), 2)},
+        ]
+        reports = [DummyReport("rb_status_a")]
+        for _ in range(3):
+            tracker.update(reports)
+        self.assertEqual(tracker.evaluations, 3)
@@ -0,0 +1,62 @@
+import datetime
+import unittest
+import pytest
+
+from rb_status_plugin.core.helpers.task_state_helper import TaskState, TaskStateCache
+
+now = datetime.datetime(2020, 4, 19, 12)
+fresh_after = now - datetime.timedelta(seconds=30)
+day = datetime.timedelta(days=1)
+
+
+@pytest.mark.compatibility
+class TaskStateCacheTest(unittest.TestCase):
+    """
+    Class for testing which lookups a cached task state answers.
+    """
+
+    state = TaskState("example_dag", "python_random_0", now - day, "success")
+
+    def test_expired_entry_misses(self):
+        entry = (None, self.state, fresh_after - datetime.timedelta(seconds=1))
+        self.assertEqual(TaskStateCache.lookup(entry, None, fresh_after), (False, None))
+
+    def test_unbounded_entry_answers_bounded_lookup(self):
+        entry = (None, self.state, now)
+        self.assertEqual(
+            TaskStateCache.lookup(entry, now - 2 * day, fresh_after), (True, self.state)
+        )
+        self.assertEqual(
+            TaskStateCache.lookup(entry, now - day / 2, fresh_after), (True, None)
+        )
+
+    def test_bounded_entry_misses_wider_lookup(self):
+        entry = (now - day, self.state, now)
+        self.assertEqual(TaskStateCache.lookup(entry, None, fresh_after), (False, None))
+        self.assertEqual(
+            TaskStateCache.lookup(entry, now - 2 * day, fresh_after), (False, None)
+        )
+
+
+@pytest.mark.compatibility
+class TaskStateRecordsTest(unittest.TestCase):
+    """
+    Class for testing that the database backed cache is best-effort.
+    """
+
+    def test_records_round_trip(self):
+        checked_at = datetime.datetime.now(datetime.timezone.utc)
+        state = TaskState("cache_dag", "cache_task", checked_at - day, "success")
+        entry = (None, state, checked_at)
+        # a second insert of the same record is an update
+        TaskStateCache.save_records({"cache_dag.cache_task": entry})
+        TaskStateCache.save_records({"cache_dag.cache_task": entry})
+
+        entries = TaskStateCache.load_records(
+            ["cache_dag.cache_task"], checked_at - datetime.timedelta(seconds=30)
+        )
+        self.assertEqual(entries["cache_dag.cache_task"][1].state, "success")
+
+    def test_failed_write_is_only_logged(self):
+        with self.assertLogs(level="WARNING"):
+            TaskStateCache.save_records({"not_a_test": (None, None, now)})